@@ -0,0 +1,27 @@
+"""
+ASGI Entry Point
+
+Alternative to wsgi.py for ASGI servers. It serves the same Flask app and
+routes, keeping connections on an event loop and running each request on
+a bounded thread pool (see backend/asgi_bridge.py):
+
+    gunicorn asgi:app --worker-class uvicorn.workers.UvicornWorker --workers 2 --bind 0.0.0.0:$PORT
+
+Prefer that to "uvicorn --workers N": uvicorn hands its worker processes a
+socket without TCP_NODELAY, and since it writes a response's headers and
+body separately, every response then waits about 40ms for the client's
+delayed ACK. A single "uvicorn asgi:app" process is not affected.
+"""
+
+import sys
+import os
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(__file__), 'backend')
+sys.path.insert(0, backend_path)
+
+from app import app as flask_app
+from asgi_bridge import ThreadPoolASGI
+
+# Expose the app for the ASGI server
+app = ThreadPoolASGI(flask_app)
@@ -1,38 +1,248 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, send_file, session
 from database import (
-    get_all_locations, get_all_cars, get_car_by_id,
     create_booking, get_user_bookings, cancel_booking,
-    check_car_availability, add_car, update_car, get_all_bookings
+    get_availability_matrix, add_car, update_car, update_cars, get_all_bookings,
+    iter_bookings_for_export, EXPORT_COLUMNS, CAR_UPDATABLE_COLUMNS, BookingConflictError
 )
+from availability_index import check_car_availability
+from catalog_cache import get_all_locations, get_all_cars, get_car_by_id, get_car_facets
+import catalog_cache
+import image_variants
+import profiler
+import slow_queries
 from auth import login_required, admin_required
+from http_cache import conditional
 from datetime import datetime
+import base64
+import csv
+import io
+import json
+import math
+import os
+import pstats
+import re
+import sqlite3
 
 api_bp = Blueprint('api', __name__)
 
+# Tables each cached endpoint's response depends on
+CATALOG_TABLES = ('cars', 'locations')
+BOOKING_TABLES = ('bookings', 'cars', 'locations')
+
+def car_search_tables():
+    """Date-filtered car searches also depend on bookings."""
+    if request.args.get('pickup_date') or request.args.get('return_date'):
+        return BOOKING_TABLES
+    return CATALOG_TABLES
+
+# Limits for the batch availability endpoint
+MAX_BATCH_CARS = 500
+MAX_BATCH_WINDOWS = 31
+
+# Limit for the bulk car update endpoint
+MAX_BULK_CARS = 1000
+
+# Expected JSON types of updatable car columns
+CAR_FIELD_TYPES = {
+    'name': str, 'brand': str, 'model': str, 'car_type': str, 'transmission': str,
+    'fuel_type': str, 'image_url': str, 'description': str, 'features': str,
+    'fleet_code': str, 'year': int, 'seats': int, 'location_id': int,
+    'price_per_day': (int, float), 'available': (bool, int),
+}
+# Numeric car columns that must be positive
+POSITIVE_CAR_FIELDS = ('year', 'seats', 'price_per_day')
+
+# Default number of fingerprints listed by the slow-query endpoint
+DEFAULT_SLOW_QUERY_LIMIT = 20
+
+# Functions listed in a profile's text summary
+PROFILE_TEXT_LINES = 60
+
+# Keyset pagination page sizes
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Most bookings /api/admin/bookings returns as a bare list (no limit/cursor)
+ADMIN_BOOKINGS_LIST_LIMIT = int(os.environ.get('ADMIN_BOOKINGS_LIST_LIMIT', 1000))
+
+# Cars per page of /api/cars/search, which is always paginated
+DEFAULT_SEARCH_PAGE_SIZE = 24
+
+# "7 seats", "7-seater" in free-text car searches
+SEATS_TEXT = re.compile(r'\b(\d{1,2})\s*-?\s*seat(?:s|ers?)?\b', re.IGNORECASE)
+
+def encode_cursor(key):
+    """Turn a row's sort key into an opaque cursor string."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Turn a cursor back into a sort key tuple. Raises ValueError if invalid."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if (not isinstance(key, list) or len(key) != 2
+            or not all(isinstance(v, (int, float, str)) and not isinstance(v, bool) for v in key)):
+        raise ValueError('Invalid cursor')
+    return tuple(key)
+
+def get_page_args(default_limit=None):
+    """Read limit/cursor query args as (limit, after); limit None means unpaginated."""
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is None and (cursor or default_limit):
+        limit = default_limit or DEFAULT_PAGE_SIZE
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+    return limit, after
+
+def paginate(rows, limit, key_columns):
+    """Build a page response from rows fetched with limit + 1."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][column] for column in key_columns)
+    return {'items': rows, 'next_cursor': next_cursor}
+
+def get_search_text():
+    """Read the q query arg as (text, seats).
+
+    A seat count written in the text ("sunroof diesel 7 seats") becomes a
+    seats filter, since seats isn't a text column; text is None when
+    nothing is left to search for.
+    """
+    q = request.args.get('q', '')
+    seats = None
+    match = SEATS_TEXT.search(q)
+    if match:
+        seats = int(match.group(1))
+        q = SEATS_TEXT.sub(' ', q)
+    return (q.strip() or None), seats
+
+def car_page_key(q):
+    """Sort key of a car listing: relevance for text searches, else price."""
+    return ('search_rank', 'id') if q else ('price_per_day', 'id')
+
+def validate_dates(pickup_date, return_date):
+    """Validate a pickup/return date pair. Returns an error message or None."""
+    try:
+        pickup = datetime.strptime(pickup_date, '%Y-%m-%d')
+        return_dt = datetime.strptime(return_date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return 'Invalid date format. Use YYYY-MM-DD'
+    
+    if pickup >= return_dt:
+        return 'Return date must be after pickup date'
+    
+    if pickup < datetime.now():
+        return 'Pickup date cannot be in the past'
+    
+    return None
+
+def validate_car_fields(fields, location_ids):
+    """Validate a car update. Returns an error message or None."""
+    if not fields:
+        return 'No fields to update'
+    unknown = set(fields) - set(CAR_UPDATABLE_COLUMNS)
+    if unknown:
+        return f"Cannot update: {', '.join(sorted(unknown))}"
+    for column, value in fields.items():
+        expected = CAR_FIELD_TYPES[column]
+        if not isinstance(value, expected) or (isinstance(value, bool) and column != 'available'):
+            return f'Invalid value for {column}'
+    if fields.get('available', 0) not in (0, 1):
+        return 'available must be true, false, 0 or 1'
+    for column in POSITIVE_CAR_FIELDS:
+        # JSON NaN/Infinity parse as floats
+        if column in fields and not (math.isfinite(fields[column]) and fields[column] > 0):
+            return f'{column} must be a positive number'
+    if 'location_id' in fields and fields['location_id'] not in location_ids:
+        return 'Unknown location_id'
+    return None
+
 @api_bp.route('/api/locations', methods=['GET'])
+@conditional(('locations',))
 def get_locations():
     """Get all locations."""
     locations = get_all_locations()
     return jsonify(locations), 200
 
 @api_bp.route('/api/cars', methods=['GET'])
+@conditional(car_search_tables)
 def get_cars():
-    """Get cars with optional filters."""
+    """Get cars with optional filters and free-text search (q)."""
     location_id = request.args.get('location_id', type=int)
     car_type = request.args.get('car_type')
     min_price = request.args.get('min_price', type=float)
     max_price = request.args.get('max_price', type=float)
+    pickup_date = request.args.get('pickup_date')
+    return_date = request.args.get('return_date')
+    q, seats = get_search_text()
+    
+    if pickup_date or return_date:
+        error = validate_dates(pickup_date, return_date)
+        if error:
+            return jsonify({'error': error}), 400
+    
+    try:
+        limit, after = get_page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     cars = get_all_cars(
         location_id=location_id,
         car_type=car_type,
         min_price=min_price,
-        max_price=max_price
+        max_price=max_price,
+        pickup_date=pickup_date,
+        return_date=return_date,
+        limit=limit + 1 if limit else None,
+        after=after,
+        seats=seats,
+        q=q
     )
     
+    if limit:
+        return jsonify(paginate(cars, limit, car_page_key(q))), 200
     return jsonify(cars), 200
 
+@api_bp.route('/api/cars/search', methods=['GET'])
+@conditional(car_search_tables)
+def search_cars():
+    """One page of matching cars plus facet counts and a price histogram."""
+    q, seats = get_search_text()
+    filters = {
+        'location_id': request.args.get('location_id', type=int),
+        'car_type': request.args.get('car_type'),
+        'fuel_type': request.args.get('fuel_type'),
+        'transmission': request.args.get('transmission'),
+        'seats': request.args.get('seats', type=int) or seats,
+        'city': request.args.get('city'),
+        'min_price': request.args.get('min_price', type=float),
+        'max_price': request.args.get('max_price', type=float),
+        'pickup_date': request.args.get('pickup_date'),
+        'return_date': request.args.get('return_date'),
+        'q': q,
+    }
+    
+    if filters['pickup_date'] or filters['return_date']:
+        error = validate_dates(filters['pickup_date'], filters['return_date'])
+        if error:
+            return jsonify({'error': error}), 400
+    
+    try:
+        limit, after = get_page_args(default_limit=DEFAULT_SEARCH_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    cars = get_all_cars(limit=limit + 1, after=after, **filters)
+    page = paginate(cars, limit, car_page_key(q))
+    page.update(get_car_facets(**filters))
+    return jsonify(page), 200
+
 @api_bp.route('/api/cars/<int:car_id>', methods=['GET'])
+@conditional(CATALOG_TABLES)
 def get_car(car_id):
     """Get car details by ID."""
     car = get_car_by_id(car_id)
@@ -56,22 +266,50 @@ def check_availability():
     return_date = data['return_date']
     
     # Validate dates
-    try:
-        pickup = datetime.strptime(pickup_date, '%Y-%m-%d')
-        return_dt = datetime.strptime(return_date, '%Y-%m-%d')
-        
-        if pickup >= return_dt:
-            return jsonify({'error': 'Return date must be after pickup date'}), 400
-        
-        if pickup < datetime.now():
-            return jsonify({'error': 'Pickup date cannot be in the past'}), 400
-    except ValueError:
-        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    error = validate_dates(pickup_date, return_date)
+    if error:
+        return jsonify({'error': error}), 400
     
     available = check_car_availability(car_id, pickup_date, return_date)
     
     return jsonify({'available': available}), 200
 
+@api_bp.route('/api/cars/availability', methods=['POST'])
+def check_availability_batch():
+    """Check many cars against one or more date windows."""
+    data = request.get_json(silent=True) or {}
+    
+    car_ids = data.get('car_ids')
+    windows = data.get('windows')
+    if not isinstance(car_ids, list) or not isinstance(windows, list) or not car_ids or not windows:
+        return jsonify({'error': 'car_ids and windows must be non-empty lists'}), 400
+    
+    if len(car_ids) > MAX_BATCH_CARS or len(windows) > MAX_BATCH_WINDOWS:
+        return jsonify({
+            'error': f'At most {MAX_BATCH_CARS} cars and {MAX_BATCH_WINDOWS} windows per request'
+        }), 400
+    
+    if not all(isinstance(car_id, int) and not isinstance(car_id, bool) for car_id in car_ids):
+        return jsonify({'error': 'car_ids must be integers'}), 400
+    
+    date_pairs = []
+    for window in windows:
+        if not isinstance(window, dict):
+            return jsonify({'error': 'Each window needs pickup_date and return_date'}), 400
+        pickup_date = window.get('pickup_date')
+        return_date = window.get('return_date')
+        error = validate_dates(pickup_date, return_date)
+        if error:
+            return jsonify({'error': error}), 400
+        date_pairs.append((pickup_date, return_date))
+    
+    matrix = get_availability_matrix(list(dict.fromkeys(car_ids)), date_pairs)
+    
+    return jsonify({
+        'windows': [{'pickup_date': p, 'return_date': r} for p, r in date_pairs],
+        'availability': {str(car_id): flags for car_id, flags in matrix.items()}
+    }), 200
+
 @api_bp.route('/api/bookings', methods=['POST'])
 @login_required
 def create_new_booking():
@@ -91,28 +329,19 @@ def create_new_booking():
     total_price = data['total_price']
     
     # Validate dates
-    try:
-        pickup = datetime.strptime(pickup_date, '%Y-%m-%d')
-        return_dt = datetime.strptime(return_date, '%Y-%m-%d')
-        
-        if pickup >= return_dt:
-            return jsonify({'error': 'Return date must be after pickup date'}), 400
-        
-        if pickup < datetime.now():
-            return jsonify({'error': 'Pickup date cannot be in the past'}), 400
-    except ValueError:
-        return jsonify({'error': 'Invalid date format'}), 400
-    
-    # Check availability
-    if not check_car_availability(car_id, pickup_date, return_date):
-        return jsonify({'error': 'Car not available for selected dates'}), 409
+    error = validate_dates(pickup_date, return_date)
+    if error:
+        return jsonify({'error': error}), 400
     
-    # Create booking
+    # Create booking; the availability check runs in the same transaction
     user_id = session['user_id']
-    booking_id = create_booking(
-        user_id, car_id, pickup_date, return_date,
-        pickup_location_id, return_location_id, total_price
-    )
+    try:
+        booking_id = create_booking(
+            user_id, car_id, pickup_date, return_date,
+            pickup_location_id, return_location_id, total_price
+        )
+    except BookingConflictError:
+        return jsonify({'error': 'Car not available for selected dates'}), 409
     
     if booking_id:
         return jsonify({
@@ -124,10 +353,20 @@ def create_new_booking():
 
 @api_bp.route('/api/bookings', methods=['GET'])
 @login_required
+@conditional(BOOKING_TABLES, private=True)
 def get_bookings():
     """Get user's bookings."""
     user_id = session['user_id']
-    bookings = get_user_bookings(user_id)
+    
+    try:
+        limit, after = get_page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    bookings = get_user_bookings(user_id, limit=limit + 1 if limit else None, after=after)
+    
+    if limit:
+        return jsonify(paginate(bookings, limit, ('created_at', 'id'))), 200
     return jsonify(bookings), 200
 
 @api_bp.route('/api/bookings/<int:booking_id>', methods=['DELETE'])
@@ -168,6 +407,9 @@ def create_car():
         description=data.get('description', ''),
         features=data.get('features', '')
     )
+    if data.get('image_url'):
+        image_variants.refresh_srcsets([data['image_url']])
+    catalog_cache.invalidate()
     
     return jsonify({
         'message': 'Car added successfully',
@@ -178,19 +420,206 @@ def create_car():
 @admin_required
 def update_car_details(car_id):
     """Update car details (admin only)."""
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     
-    # Remove id from data if present
+    # Remove id from data if present; update_car ignores null values
     data.pop('id', None)
+    data = {column: value for column, value in data.items() if value is not None}
+    
+    error = validate_car_fields(data, {location['id'] for location in get_all_locations()})
+    if error:
+        return jsonify({'error': error}), 400
+    if 'available' in data:
+        data['available'] = int(data['available'])
+    
+    try:
+        updated = update_car(car_id, **data)
+    except sqlite3.IntegrityError as e:
+        if 'fleet_code' not in str(e):
+            raise
+        return jsonify({'error': 'fleet_code already in use'}), 409
     
-    if update_car(car_id, **data):
+    if updated:
+        if 'image_url' in data:
+            image_variants.refresh_srcsets([data['image_url']])
+        catalog_cache.invalidate()
         return jsonify({'message': 'Car updated successfully'}), 200
     else:
         return jsonify({'error': 'Failed to update car'}), 500
 
+@api_bp.route('/api/admin/cars', methods=['PATCH'])
+@admin_required
+def update_cars_bulk():
+    """Update many cars in one transaction, with a result per row (admin only)."""
+    data = request.get_json(silent=True) or {}
+    
+    cars = data.get('cars')
+    if not isinstance(cars, list) or not cars:
+        return jsonify({'error': 'cars must be a non-empty list'}), 400
+    
+    if len(cars) > MAX_BULK_CARS:
+        return jsonify({'error': f'At most {MAX_BULK_CARS} cars per request'}), 400
+    
+    location_ids = {location['id'] for location in get_all_locations()}
+    results = []
+    updates = []
+    seen = set()
+    for row in cars:
+        if not isinstance(row, dict):
+            results.append({'id': None, 'status': 'invalid', 'error': 'Each row must be an object'})
+            continue
+        fields = dict(row)
+        car_id = fields.pop('id', None)
+        if not isinstance(car_id, int) or isinstance(car_id, bool):
+            error = 'id must be an integer'
+        elif car_id in seen:
+            error = 'Duplicate id'
+        else:
+            error = validate_car_fields(fields, location_ids)
+        if error:
+            results.append({'id': car_id, 'status': 'invalid', 'error': error})
+            continue
+        seen.add(car_id)
+        if 'available' in fields:
+            fields['available'] = int(fields['available'])
+        results.append({'id': car_id, 'status': None})
+        updates.append((car_id, fields))
+    
+    statuses = {}
+    if updates:
+        try:
+            statuses = update_cars(updates)
+        except sqlite3.IntegrityError as e:
+            if 'fleet_code' not in str(e):
+                raise
+            return jsonify({'error': 'fleet_code already in use; no cars were updated'}), 409
+        image_urls = [fields['image_url'] for car_id, fields in updates
+                      if 'image_url' in fields and statuses[car_id] == 'updated']
+        if image_urls:
+            image_variants.refresh_srcsets(image_urls)
+        if 'updated' in statuses.values():
+            catalog_cache.invalidate()
+    
+    for result in results:
+        if result['status'] is None:
+            result['status'] = statuses[result['id']]
+    
+    return jsonify({
+        'results': results,
+        'updated': sum(1 for result in results if result['status'] == 'updated')
+    }), 200
+
 @api_bp.route('/api/admin/bookings', methods=['GET'])
 @admin_required
 def get_all_bookings_admin():
-    """Get all bookings (admin only)."""
-    bookings = get_all_bookings()
-    return jsonify(bookings), 200
+    """Get all bookings (admin only).
+
+    Without limit/cursor this is a bare list of at most
+    ADMIN_BOOKINGS_LIST_LIMIT bookings; when there are more, a Link header
+    (rel="next") and X-Next-Cursor point at the paginated rest.
+    """
+    try:
+        limit, after = get_page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if limit:
+        bookings = get_all_bookings(limit=limit + 1, after=after)
+        return jsonify(paginate(bookings, limit, ('created_at', 'id'))), 200
+    
+    page = paginate(get_all_bookings(limit=ADMIN_BOOKINGS_LIST_LIMIT + 1),
+                    ADMIN_BOOKINGS_LIST_LIMIT, ('created_at', 'id'))
+    response = jsonify(page['items'])
+    if page['next_cursor']:
+        response.headers['Link'] = (
+            f'<{request.path}?limit={MAX_PAGE_SIZE}&cursor={page["next_cursor"]}>; rel="next"'
+        )
+        response.headers['X-Next-Cursor'] = page['next_cursor']
+    return response, 200
+
+@api_bp.route('/api/admin/bookings/export', methods=['GET'])
+@admin_required
+def export_bookings():
+    """Stream all bookings as CSV or NDJSON (admin only)."""
+    export_format = request.args.get('format', 'csv')
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    try:
+        for value in (date_from, date_to):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    batches = iter_bookings_for_export(date_from, date_to)
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in batches:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    def generate_ndjson():
+        for rows in batches:
+            yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in rows)
+    
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=bookings.{export_format}'
+    })
+
+@api_bp.route('/api/admin/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_queries():
+    """Top statement fingerprints by total time in this worker (admin only)."""
+    limit = request.args.get('limit', DEFAULT_SLOW_QUERY_LIMIT, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    
+    recorder = slow_queries.recorder
+    if recorder is None:
+        return jsonify({'enabled': False, 'fingerprints': []}), 200
+    return jsonify({
+        'enabled': True,
+        'threshold_ms': recorder.threshold * 1000,
+        'pid': os.getpid(),
+        'fingerprints': recorder.top(limit)
+    }), 200
+
+@api_bp.route('/api/admin/profiles', methods=['GET'])
+@admin_required
+def get_profiles():
+    """Stored request profiles, most recently used first (admin only)."""
+    return jsonify(profiler.list_profiles()), 200
+
+@api_bp.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def get_profile_data(profile_id):
+    """Download a profile, or ?format=text for a cProfile summary (admin only)."""
+    found = profiler.get_profile(profile_id)
+    if not found:
+        return jsonify({'error': 'Profile not found'}), 404
+    profile, path = found
+    
+    if request.args.get('format') == 'text' and profile['profiler'] == 'cprofile':
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'calls'):
+            return jsonify({'error': 'sort must be cumulative, tottime or calls'}), 400
+        buffer = io.StringIO()
+        pstats.Stats(path, stream=buffer).sort_stats(sort).print_stats(PROFILE_TEXT_LINES)
+        return Response(buffer.getvalue(), mimetype='text/plain')
+    
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
@@ -1,15 +1,22 @@
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 import os
-from database import init_db
+from database import init_db, migrate_db, DATABASE_PATH
 from auth import auth_bp
 from api import api_bp
+from static_assets import load_manifest, send_asset
+from metrics import init_metrics
+from slow_queries import init_slow_query_log
+from profiler import init_profiling
 
 app = Flask(__name__, static_folder='../frontend')
 
 # Use environment variable for secret key in production, fallback for development
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production-12345')
 
+# Larger request bodies get a 413; asgi.py refuses them while still reading
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 2 * 1024 * 1024))
+
 # Enable CORS for frontend communication
 # In production, Render will serve both frontend and backend from same origin
 allowed_origins = [
@@ -23,13 +30,30 @@ CORS(app, supports_credentials=True, origins=[origin for origin in allowed_origi
 app.register_blueprint(auth_bp)
 app.register_blueprint(api_bp)
 
+# Request timing, Server-Timing headers and /metrics
+init_metrics(app)
+
+# Opt-in slow-query log (SLOW_QUERY_MS)
+init_slow_query_log(app)
+
+# Admin-requested and sampled request profiles (X-Profile header, PROFILE_SAMPLE_RATE)
+init_profiling(app)
+
+# Built asset manifest (see static_assets.py); None serves frontend/ directly
+static_manifest = load_manifest()
+
 # Serve frontend files
 @app.route('/')
 def index():
+    if static_manifest:
+        return send_asset(static_manifest, 'index.html')
     return send_from_directory(app.static_folder, 'index.html')
 
 @app.route('/<path:path>')
 def serve_static(path):
+    if static_manifest:
+        # Unknown paths fall back to index.html inside send_asset
+        return send_asset(static_manifest, path)
     if os.path.exists(os.path.join(app.static_folder, path)):
         return send_from_directory(app.static_folder, path)
     else:
@@ -38,14 +62,17 @@ def serve_static(path):
 
 @app.errorhandler(404)
 def not_found(e):
+    if static_manifest:
+        return send_asset(static_manifest, 'index.html')
     return send_from_directory(app.static_folder, 'index.html')
 
 # Initialize database on startup (for both development and production)
-db_path = os.path.join(os.path.dirname(__file__), 'car_rental.db')
-if not os.path.exists(db_path):
+if not os.path.exists(DATABASE_PATH):
     print("Initializing database...")
     init_db()
     print("Database initialized with sample data!")
+else:
+    migrate_db()
 
 if __name__ == '__main__':
     print("Starting Car Rental Server...")
@@ -55,5 +82,8 @@ if __name__ == '__main__':
     # Use PORT environment variable for production (Render), default to 5000 for development
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV', 'development') != 'production'
+    if debug:
+        # Serve frontend/ as edited rather than the last build
+        static_manifest = None
     
     app.run(debug=debug, host='0.0.0.0', port=port)
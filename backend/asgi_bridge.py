@@ -0,0 +1,218 @@
+"""
+Serve the Flask app over ASGI, running requests on bounded thread pools.
+
+Under gunicorn's sync workers every open request holds a worker (or a
+worker thread) for its whole life, including the time its client spends
+sending the body or reading the response. ThreadPoolASGI keeps connections
+and request/response I/O on the event loop and only borrows a thread while
+Flask is running the view and producing the response body:
+
+- /api/login and /api/register run on a small auth pool (ASGI_AUTH_THREADS),
+  since they mostly wait for bcrypt, so a login burst can't take every
+  thread from the catalog and booking endpoints
+- everything else runs on the main pool (ASGI_THREADS)
+
+Requests waiting for a thread cost one coroutine each, so a process can
+keep thousands of connections open. Once more than ASGI_QUEUE requests are
+waiting for one pool, new ones get a 503 straight away instead of queuing
+without bound; a request keeps its place until its thread finishes, even
+if the client disconnects first. Request bodies are read on the loop and refused with a 413
+as soon as they pass the Flask app's MAX_CONTENT_LENGTH.
+
+A streamed response (the bookings export) keeps its thread until the client
+has read the last chunk: its generator holds a database connection and has
+to run on a thread, and waiting for each send is what stops a slow client
+from making the process buffer the whole export.
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
+ASGI_AUTH_THREADS = int(os.environ.get('ASGI_AUTH_THREADS', 4))
+ASGI_QUEUE = int(os.environ.get('ASGI_QUEUE', 1000))
+
+# Paths dominated by bcrypt, served from the auth pool
+AUTH_PATHS = ('/api/login', '/api/register')
+
+BUSY_BODY = b'{"error": "Server busy, please try again shortly"}'
+TOO_LARGE_BODY = b'{"error": "Request body too large"}'
+
+class BoundedPool:
+    """A thread pool plus a limit on how many requests may wait for it."""
+
+    def __init__(self, name, threads, queue_depth):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=name)
+        self.slots = threads + queue_depth
+        self.rejected = 0
+
+    def try_acquire(self):
+        if self.slots <= 0:
+            self.rejected += 1
+            return False
+        self.slots -= 1
+        return True
+
+    def release(self):
+        self.slots += 1
+
+    def release_threadsafe(self, loop):
+        """release() from a pool thread; slots are only touched on the loop."""
+        try:
+            loop.call_soon_threadsafe(self.release)
+        except RuntimeError:
+            pass  # loop already closed at shutdown
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI http scope and the full request body."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = 'HTTP_' + name
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ', ') + value
+        environ[key] = value
+    return environ
+
+class ThreadPoolASGI:
+    """ASGI application running a WSGI app on bounded thread pools."""
+
+    def __init__(self, wsgi_app, threads=ASGI_THREADS, auth_threads=ASGI_AUTH_THREADS,
+                 queue_depth=ASGI_QUEUE, max_body=None):
+        self.wsgi_app = wsgi_app
+        # Defaults to the Flask app's MAX_CONTENT_LENGTH; None reads any size
+        if max_body is None:
+            max_body = getattr(wsgi_app, 'config', {}).get('MAX_CONTENT_LENGTH')
+        self.max_body = max_body
+        self.pool = BoundedPool('asgi', threads, queue_depth)
+        self.auth_pool = BoundedPool('asgi-auth', auth_threads, queue_depth)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for pool in (self.pool, self.auth_pool):
+                    pool.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def send_error(self, send, status, body, headers=()):
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'), *headers,
+        ]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def http(self, scope, receive, send):
+        length = dict(scope['headers']).get(b'content-length', b'')
+        if self.max_body is not None and length.isdigit() and int(length) > self.max_body:
+            await self.send_error(send, 413, TOO_LARGE_BODY)
+            return
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if self.max_body is not None and size > self.max_body:
+                # Chunked bodies have no Content-Length to check up front
+                await self.send_error(send, 413, TOO_LARGE_BODY)
+                return
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+
+        pool = self.auth_pool if scope['path'] in AUTH_PATHS else self.pool
+        if not pool.try_acquire():
+            await self.send_error(send, 503, BUSY_BODY, [(b'retry-after', b'1')])
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            environ = build_environ(scope, b''.join(chunks))
+            future = pool.executor.submit(self.run_wsgi, environ, send, loop)
+        except BaseException:
+            pool.release()
+            raise
+        # Release when the thread is done, not when this coroutine is: a
+        # client disconnect cancels the await while Flask keeps running
+        future.add_done_callback(lambda _: pool.release_threadsafe(loop))
+        await asyncio.wrap_future(future, loop=loop)
+
+    def run_wsgi(self, environ, send, loop):
+        """Run the WSGI app on a pool thread, sending its response from the loop."""
+        def send_now(message):
+            # Waiting for each send keeps a slow client from buffering the whole body
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = []
+        started = False
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response[:] = [status, headers]
+            return write
+
+        def start():
+            nonlocal started
+            if not started:
+                status, headers = response
+                send_now({
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in headers],
+                })
+                started = True
+
+        def write(data):
+            start()
+            send_now({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+        body = self.wsgi_app(environ, start_response)
+        try:
+            for data in body:
+                if data:
+                    write(data)
+            start()
+            send_now({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
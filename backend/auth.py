@@ -1,9 +1,16 @@
-from flask import Blueprint, request, jsonify, session
-import bcrypt
-from database import create_user, get_user_by_email, get_user_by_id
+from flask import Blueprint, request, jsonify, session, g
+from database import create_user, get_user_by_email, update_user_password_hash
+from passwords import password_hasher, PasswordHasherBusy
+from user_cache import get_user_profile, prime_user_profile
 
 auth_bp = Blueprint('auth', __name__)
 
+def server_busy():
+    """503 response for when the password workers are saturated."""
+    response = jsonify({'error': 'Server busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/api/register', methods=['POST'])
 def register():
     """Register a new user."""
@@ -25,7 +32,10 @@ def register():
         return jsonify({'error': 'Email already registered'}), 409
     
     # Hash password
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    try:
+        password_hash = password_hasher.hash(password)
+    except PasswordHasherBusy:
+        return server_busy()
     
     # Create user
     user_id = create_user(email, password_hash, full_name, phone)
@@ -66,11 +76,24 @@ def login():
         return jsonify({'error': 'Invalid email or password'}), 401
     
     # Verify password
-    if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+    try:
+        valid = password_hasher.verify(password, user['password_hash'])
+    except PasswordHasherBusy:
+        return server_busy()
+    
+    if valid:
+        # Upgrade hashes made with a different bcrypt cost
+        if password_hasher.needs_rehash(user['password_hash']):
+            try:
+                update_user_password_hash(user['id'], password_hasher.hash(password))
+            except PasswordHasherBusy:
+                pass
+        
         # Create session
         session['user_id'] = user['id']
         session['email'] = user['email']
         session['is_admin'] = bool(user['is_admin'])
+        prime_user_profile(user)
         
         return jsonify({
             'message': 'Login successful',
@@ -97,7 +120,7 @@ def get_current_user():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    user = get_user_by_id(session['user_id'])
+    user = get_user_profile(session['user_id'])
     
     if user:
         return jsonify({
@@ -110,27 +133,42 @@ def get_current_user():
     else:
         return jsonify({'error': 'User not found'}), 404
 
+def current_user_profile():
+    """Cached profile of the session user (None if logged out or deleted).
+
+    Read once per request. A miss in user_cache (first request in this
+    worker, expiry, or any write to users since) runs a users query, so
+    login_required and admin_required views can touch the database even
+    when the view itself doesn't.
+    """
+    if 'user_id' not in session:
+        return None
+    if 'current_user' not in g:
+        g.current_user = get_user_profile(session['user_id'])
+    return g.current_user
+
 def login_required(f):
-    """Decorator to require login."""
+    """Decorator to require login (loads the profile, see current_user_profile)."""
     from functools import wraps
     
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if not current_user_profile():
             return jsonify({'error': 'Authentication required'}), 401
         return f(*args, **kwargs)
     
     return decorated_function
 
 def admin_required(f):
-    """Decorator to require admin privileges."""
+    """Decorator to require admin privileges (loads the profile, see current_user_profile)."""
     from functools import wraps
     
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        user = current_user_profile()
+        if not user:
             return jsonify({'error': 'Authentication required'}), 401
-        if not session.get('is_admin'):
+        if not user['is_admin']:
             return jsonify({'error': 'Admin privileges required'}), 403
         return f(*args, **kwargs)
     
@@ -0,0 +1,148 @@
+"""
+In-memory interval index of confirmed bookings, one per worker process.
+
+Each car's confirmed bookings are loaded lazily from SQLite and kept sorted
+by pickup date together with a running max of return dates, so an overlap
+check is a single bisect. The index is kept current by create_booking() and
+cancel_booking() in this process, and compares the bookings change counter
+in table_versions to notice writes made by other workers.
+
+Enable with AVAILABILITY_INDEX=1; otherwise checks go straight to SQL.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_right
+
+import database
+
+AVAILABILITY_INDEX_ENABLED = os.environ.get('AVAILABILITY_INDEX', '0') == '1'
+
+# Seconds between change-counter checks; 0 checks on every lookup
+AVAILABILITY_INDEX_CHECK_INTERVAL = float(os.environ.get('AVAILABILITY_INDEX_CHECK_INTERVAL', 0))
+
+class CarIntervals:
+    """Confirmed bookings of one car, sorted by pickup date."""
+
+    __slots__ = ('pickups', 'returns', 'ids', 'max_returns')
+
+    def __init__(self, bookings=()):
+        self.pickups = []
+        self.returns = []
+        self.ids = []
+        self.max_returns = []
+        for booking_id, pickup_date, return_date in sorted(bookings, key=lambda b: b[1]):
+            self.pickups.append(pickup_date)
+            self.returns.append(return_date)
+            self.ids.append(booking_id)
+        self._rebuild_max(0)
+
+    def _rebuild_max(self, start):
+        del self.max_returns[start:]
+        running = self.max_returns[-1] if self.max_returns else None
+        for return_date in self.returns[start:]:
+            running = return_date if running is None or return_date > running else running
+            self.max_returns.append(running)
+
+    def overlaps(self, pickup_date, return_date):
+        """True if any booking overlaps [pickup_date, return_date]."""
+        started = bisect_right(self.pickups, return_date)
+        return bool(started) and self.max_returns[started - 1] >= pickup_date
+
+    def add(self, booking_id, pickup_date, return_date):
+        if booking_id in self.ids:
+            return
+        i = bisect_right(self.pickups, pickup_date)
+        self.pickups.insert(i, pickup_date)
+        self.returns.insert(i, return_date)
+        self.ids.insert(i, booking_id)
+        self._rebuild_max(i)
+
+    def remove(self, booking_id):
+        if booking_id not in self.ids:
+            return
+        i = self.ids.index(booking_id)
+        del self.pickups[i], self.returns[i], self.ids[i]
+        self._rebuild_max(i)
+
+class AvailabilityIndex:
+    """Lazily loaded per-car interval index with write-through updates."""
+
+    def __init__(self, check_interval=AVAILABILITY_INDEX_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._cars = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _sync(self):
+        """Drop everything if another process changed bookings."""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        version = database.get_table_versions('bookings').get('bookings', 0)
+        with self._lock:
+            if version != self._version:
+                self._cars = {}
+                self._version = version
+            self._checked_at = now
+
+    def _load(self, car_id):
+        version = self._version
+        conn = database.get_db_connection()
+        rows = conn.execute('''
+            SELECT id, pickup_date, return_date FROM bookings
+            WHERE car_id = ? AND status = 'confirmed'
+        ''', (car_id,)).fetchall()
+        conn.close()
+        intervals = CarIntervals(tuple(row) for row in rows)
+        with self._lock:
+            self.loads += 1
+            if self._version != version:
+                # Invalidated while loading; answer from it but don't keep it
+                return intervals
+            return self._cars.setdefault(car_id, intervals)
+
+    def is_available(self, car_id, pickup_date, return_date):
+        """Check a car for the given dates without querying bookings."""
+        self._sync()
+        intervals = self._cars.get(car_id)
+        if intervals is None:
+            intervals = self._load(car_id)
+        with self._lock:
+            return not intervals.overlaps(pickup_date, return_date)
+
+    def on_booking_change(self, event, booking, version):
+        """Apply a booking write from this process (see database.BOOKING_LISTENERS)."""
+        with self._lock:
+            if self._version is None or version != self._version + 1:
+                # Someone else wrote in between; start over on the next lookup
+                self._cars = {}
+                self._version = None
+                return
+            self._version = version
+            intervals = self._cars.get(int(booking['car_id']))
+            if intervals is None:
+                return
+            if event == 'created':
+                intervals.add(booking['id'], booking['pickup_date'], booking['return_date'])
+            elif event == 'cancelled':
+                intervals.remove(booking['id'])
+
+    def clear(self):
+        with self._lock:
+            self._cars = {}
+            self._version = None
+
+availability_index = AvailabilityIndex()
+
+if AVAILABILITY_INDEX_ENABLED:
+    database.BOOKING_LISTENERS.append(availability_index.on_booking_change)
+
+def check_car_availability(car_id, pickup_date, return_date):
+    """Check availability through the index when enabled, else through SQL."""
+    if AVAILABILITY_INDEX_ENABLED and str(car_id).isdigit():
+        return availability_index.is_available(int(car_id), pickup_date, return_date)
+    return database.check_car_availability(car_id, pickup_date, return_date)
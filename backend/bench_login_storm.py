@@ -0,0 +1,77 @@
+"""
+Benchmark: catalog latency while a storm of logins hits the same process.
+
+Runs the Flask app in-process against a scratch database. One thread keeps
+requesting /api/cars while N threads log in as fast as they can; catalog
+latency is reported with and without the storm, along with how many logins
+succeeded or were shed with 503.
+
+Usage: python bench_login_storm.py [--logins 32] [--seconds 5]
+       (PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE and BCRYPT_ROUNDS apply)
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import database
+from bench_stats import percentile
+
+def measure_catalog(app, stop, samples):
+    client = app.test_client()
+    while not stop.is_set():
+        start = time.perf_counter()
+        client.get('/api/cars')
+        samples.append((time.perf_counter() - start) * 1000)
+
+def storm_logins(app, stop, outcomes):
+    client = app.test_client()
+    while not stop.is_set():
+        response = client.post('/api/login', json={
+            'email': 'admin@carrental.com', 'password': 'admin123'
+        })
+        outcomes[response.status_code] += 1
+
+def run_phase(app, seconds, logins):
+    stop = threading.Event()
+    samples = []
+    outcomes = Counter()
+    threads = [threading.Thread(target=measure_catalog, args=(app, stop, samples))]
+    threads += [threading.Thread(target=storm_logins, args=(app, stop, outcomes)) for _ in range(logins)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return samples, outcomes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=32, help='concurrent login threads')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each phase')
+    args = parser.parse_args()
+
+    database.DATABASE_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_PATH'] = database.DATABASE_PATH
+    database.init_db()
+    os.environ.setdefault('CATALOG_CACHE', '0')
+
+    from app import app
+    from passwords import password_hasher
+
+    print(f"bcrypt rounds={password_hasher.rounds}, workers={password_hasher.workers}")
+    for label, logins in (('idle', 0), (f'{args.logins} concurrent logins', args.logins)):
+        samples, outcomes = run_phase(app, args.seconds, logins)
+        print(f"\n/api/cars during {label}: {len(samples)} requests")
+        print(f"  p50 {statistics.median(samples):.2f} ms  "
+              f"p95 {percentile(samples, 95):.2f} ms  p99 {percentile(samples, 99):.2f} ms")
+        if outcomes:
+            print("  logins: " + ', '.join(f"{status}: {count}" for status, count in sorted(outcomes.items())))
+
+if __name__ == '__main__':
+    main()
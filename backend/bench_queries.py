@@ -0,0 +1,272 @@
+"""
+Benchmark the query functions in database.py at several dataset sizes.
+
+Each size is a database from generate_dataset.py, built once and kept in
+BENCH_DATA_DIR. Every case is measured in --repeats rounds, interleaved so
+that drift in machine load hits all cases alike. In each round the function
+is called repeatedly for up to --seconds (at least --min-runs times) with
+arguments drawn from the dataset. ops/sec and p50/p95/p99 latency are the
+medians over the rounds, and "noise" is how far the rounds' p50s spread
+(bench_stats.spread()). The peak Python memory of one call is measured in a
+separate tracemalloc pass so it doesn't skew the timings. cancel_booking
+writes, so it runs against a scratch copy.
+
+Results can be saved as JSON and compared with an earlier run; the script
+exits with status 1 when a case's median p50 got worse by more than both
+--threshold and the noise measured in either run, so a slowdown has to
+stand out from run-to-run variation to fail.
+
+Usage: python bench_queries.py [--sizes small,medium] [--output results.json]
+                               [--repeats 5] [--compare baseline.json] [--threshold 0.5]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import database
+from bench_stats import percentile, spread
+from generate_dataset import SIZES, generate
+
+BENCH_DATA_DIR = os.environ.get(
+    'BENCH_DATA_DIR', os.path.join(tempfile.gettempdir(), 'car-rental-bench')
+)
+BENCH_SEED = 42
+# Fixed so cached datasets stay valid from one day to the next
+BENCH_START = date(2026, 1, 1)
+
+def dataset_path(size):
+    """Path of the generated database for a size, building it if needed."""
+    path = os.path.join(BENCH_DATA_DIR, f'{size}-{BENCH_SEED}.db')
+    if not os.path.exists(path):
+        os.makedirs(BENCH_DATA_DIR, exist_ok=True)
+        print(f"Generating {size} dataset at {path}...")
+        building = path + '.building'
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(building + suffix):
+                os.remove(building + suffix)
+        locations, cars, users, bookings = SIZES[size]
+        generate(building, locations, cars, users, bookings, seed=BENCH_SEED, start=BENCH_START)
+        database.get_pool().close_all()
+        # Fold the WAL back in so the file can be copied on its own
+        conn = sqlite3.connect(building)
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.close()
+        os.rename(building, path)
+    return path
+
+def sample_args(path, rng):
+    """Ids and date windows to draw benchmark arguments from."""
+    conn = sqlite3.connect(path)
+    car_ids = [row[0] for row in conn.execute('SELECT id FROM cars')]
+    location_ids = [row[0] for row in conn.execute('SELECT id FROM locations')]
+    user_ids = [row[0] for row in conn.execute(
+        'SELECT DISTINCT user_id FROM bookings LIMIT 5000'
+    )]
+    # (booking id, user id) pairs to cancel
+    confirmed = conn.execute('''
+        SELECT id, user_id FROM bookings WHERE status = 'confirmed'
+        ORDER BY random() LIMIT 5000
+    ''').fetchall()
+    created = [row[0] for row in conn.execute(
+        'SELECT created_at FROM bookings ORDER BY random() LIMIT 1000'
+    )]
+    conn.close()
+    return {
+        'car_ids': car_ids, 'location_ids': location_ids, 'user_ids': user_ids,
+        'confirmed': confirmed, 'created': created or ['2030-01-01 00:00:00'],
+    }
+
+def random_window(rng):
+    pickup = BENCH_START + timedelta(days=rng.randint(0, 700))
+    return pickup.isoformat(), (pickup + timedelta(days=rng.randint(1, 10))).isoformat()
+
+def cases(args, rng):
+    """(name, function, argument factory) for every benchmarked call."""
+    def window_kwargs():
+        pickup_date, return_date = random_window(rng)
+        return {'pickup_date': pickup_date, 'return_date': return_date}
+
+    confirmed = iter(args['confirmed'])
+    return [
+        ('get_all_cars', database.get_all_cars, lambda: {}),
+        ('get_all_cars(location)', database.get_all_cars,
+         lambda: {'location_id': rng.choice(args['location_ids'])}),
+        ('get_all_cars(type)', database.get_all_cars,
+         lambda: {'car_type': rng.choice(['SUV', 'Sedan', 'Luxury SUV', 'Sports Car'])}),
+        ('get_all_cars(price)', database.get_all_cars,
+         lambda: {'min_price': 80, 'max_price': 120}),
+        ('get_all_cars(dates)', database.get_all_cars, window_kwargs),
+        ('get_all_cars(page)', database.get_all_cars,
+         lambda: {'limit': 51, 'after': (rng.uniform(40, 300), 0)}),
+        ('get_all_cars(q)', database.get_all_cars,
+         lambda: {'q': rng.choice(['suv', 'diesel auto', 'toyota hybrid', 'sunroof', 'leath']), 'limit': 25}),
+        ('get_car_facets', database.get_car_facets, lambda: {}),
+        ('get_car_facets(type)', database.get_car_facets,
+         lambda: {'car_type': rng.choice(['SUV', 'Sedan', 'Luxury SUV', 'Sports Car'])}),
+        ('check_car_availability', database.check_car_availability,
+         lambda: dict(zip(('pickup_date', 'return_date'), random_window(rng)),
+                      car_id=rng.choice(args['car_ids']))),
+        ('get_user_bookings', database.get_user_bookings,
+         lambda: {'user_id': rng.choice(args['user_ids'])}),
+        ('get_user_bookings(page)', database.get_user_bookings,
+         lambda: {'user_id': rng.choice(args['user_ids']), 'limit': 21}),
+        ('get_all_bookings', database.get_all_bookings, lambda: {}),
+        ('get_all_bookings(page)', database.get_all_bookings,
+         lambda: {'limit': 51, 'after': (rng.choice(args['created']), 2 ** 62)}),
+        ('cancel_booking', database.cancel_booking,
+         lambda: dict(zip(('booking_id', 'user_id'), next(confirmed)))),
+    ]
+
+def run_case(function, make_kwargs, seconds, min_runs, max_runs):
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+        kwargs = make_kwargs()
+        start = time.perf_counter()
+        function(**kwargs)
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(**make_kwargs())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'runs': len(samples),
+        'ops_per_sec': round(len(samples) / sum(samples), 1),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+def summarize(rounds):
+    """One result from the results of several rounds of a case."""
+    def median(key):
+        return round(statistics.median(r[key] for r in rounds), 3)
+    p50s = [r['p50_ms'] for r in rounds]
+    return {
+        'runs': sum(r['runs'] for r in rounds),
+        'ops_per_sec': round(statistics.median(r['ops_per_sec'] for r in rounds), 1),
+        'p50_ms': median('p50_ms'),
+        'p95_ms': median('p95_ms'),
+        'p99_ms': median('p99_ms'),
+        'p50_rounds': p50s,
+        'noise': round(spread(p50s), 3),
+        'peak_kb': max(r['peak_kb'] for r in rounds),
+    }
+
+def bench_size(size, seconds, min_runs, max_runs, repeats=1):
+    base = dataset_path(size)
+    scratch = os.path.join(tempfile.mkdtemp(), f'{size}.db')
+    shutil.copyfile(base, scratch)
+    database.DATABASE_PATH = scratch
+    # Cached datasets may predate newer migrations
+    database.migrate_db()
+    rng = random.Random(BENCH_SEED)
+    results = {}
+    try:
+        args = sample_args(scratch, rng)
+        benchmarks = cases(args, rng)
+        rounds = {name: [] for name, _, _ in benchmarks}
+        for _ in range(repeats):
+            for name, function, make_kwargs in benchmarks:
+                # cancel_booking can only run once per confirmed booking
+                if name == 'cancel_booking':
+                    runs = min(max_runs, (len(args['confirmed']) - 1) // repeats)
+                else:
+                    runs = max_runs
+                rounds[name].append(run_case(function, make_kwargs, seconds, min(min_runs, runs), runs))
+        for name, case_rounds in rounds.items():
+            results[name] = r = summarize(case_rounds)
+            print(f"  {name:<26} {r['ops_per_sec']:>10.1f} ops/s  p50 {r['p50_ms']:>9.3f} ms  "
+                  f"p95 {r['p95_ms']:>9.3f} ms  p99 {r['p99_ms']:>9.3f} ms  "
+                  f"noise {r['noise']:>5.0%}  peak {r['peak_kb']:>9.1f} KB")
+    finally:
+        database.get_pool().close_all()
+        shutil.rmtree(os.path.dirname(scratch), ignore_errors=True)
+    return results
+
+def compare(results, baseline, threshold):
+    """Print p50 changes against a baseline; returns the regressed cases.
+
+    A case regresses when its p50 grew by more than threshold and by more
+    than the noise of either run.
+    """
+    regressions = []
+    print(f"\nCompared with baseline (median p50, threshold {threshold:.0%} or the measured noise):")
+    for size, size_results in results.items():
+        for name, result in size_results.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before or not before['p50_ms']:
+                continue
+            change = result['p50_ms'] / before['p50_ms'] - 1
+            limit = max(threshold, result.get('noise', 0), before.get('noise', 0))
+            flag = 'REGRESSION' if change > limit else ''
+            print(f"  {size:<7} {name:<26} {before['p50_ms']:>9.3f} -> {result['p50_ms']:>9.3f} ms "
+                  f"({change:+.0%}, limit {limit:.0%}) {flag}")
+            if flag:
+                regressions.append(f'{size}/{name}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark database.py query functions.')
+    parser.add_argument('--sizes', default='small,medium', help=f"comma-separated: {', '.join(SIZES)}")
+    parser.add_argument('--seconds', type=float, default=1, help='time budget per case and round')
+    parser.add_argument('--repeats', type=int, default=5, help='rounds per case')
+    parser.add_argument('--min-runs', type=int, default=5)
+    parser.add_argument('--max-runs', type=int, default=2000)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='smallest p50 slowdown that fails, if above the noise (0.5 = 50%%)')
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size: {', '.join(unknown)}")
+
+    results = {}
+    for size in sizes:
+        print(f"\n{size}: {', '.join(f'{n:,}' for n in SIZES[size])} locations/cars/users/bookings")
+        results[size] = bench_size(size, args.seconds, args.min_runs, args.max_runs, args.repeats)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'seed': BENCH_SEED,
+            'repeats': args.repeats,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == '__main__':
+    main()
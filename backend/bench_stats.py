@@ -0,0 +1,22 @@
+"""
+Summary statistics shared by the benchmark and load-test scripts.
+"""
+
+import statistics
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of samples (pct from 0 to 100)."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def spread(values):
+    """Relative noise of repeated measurements: (max - min) / median.
+
+    With five or more values the highest and lowest are left out first, so
+    a single disturbed round doesn't set the noise on its own.
+    """
+    middle = statistics.median(values)
+    ordered = sorted(values)
+    if len(ordered) >= 5:
+        ordered = ordered[1:-1]
+    return (ordered[-1] - ordered[0]) / middle if middle else 0.0
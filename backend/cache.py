@@ -0,0 +1,139 @@
+"""
+In-process caches shared by the catalog and user profile layers.
+
+TTLCache is a thread-safe LRU with per-entry expiry. VersionedCache wraps
+one and clears it whenever the change counters in table_versions for the
+tables it depends on move, so caches stay coherent across gunicorn workers.
+Code that reads those counters anyway (the ETags in http_cache.py) passes
+them to observe_versions(), so a response never pairs a fresh ETag with a
+body cached before the change.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import database
+
+MISSING = object()
+
+# Every VersionedCache, for observe_versions()
+_versioned_caches = []
+
+def observe_versions(versions):
+    """Bring every cache in line with table versions just read elsewhere."""
+    for cache in _versioned_caches:
+        cache.observe(versions)
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+class VersionedCache:
+    """TTLCache kept coherent with the database through table change counters."""
+
+    def __init__(self, tables, maxsize, ttl, check_interval):
+        self.tables = tables
+        self.check_interval = check_interval
+        self.entries = TTLCache(maxsize, ttl)
+        self._versions = None
+        self._checked_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.invalidations = 0
+        _versioned_caches.append(self)
+
+    def _check_versions(self):
+        if self._versions is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self.observe(database.get_table_versions(*self.tables))
+
+    def observe(self, versions):
+        """Clear the cache if versions (name -> counter) differ from its own.
+
+        Ignored unless versions covers every table the cache depends on.
+        """
+        if not all(name in versions for name in self.tables):
+            return
+        versions = {name: versions[name] for name in self.tables}
+        with self._lock:
+            if versions != self._versions:
+                if self._versions is not None:
+                    self.invalidations += 1
+                self._versions = versions
+                self._generation += 1
+                self.entries.clear()
+            self._checked_at = time.monotonic()
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss."""
+        self._check_versions()
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            generation = self._generation
+            value = loader()
+            # Don't store a value loaded across an invalidation
+            with self._lock:
+                if generation == self._generation:
+                    self.entries.set(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a value obtained elsewhere (e.g. from a wider query)."""
+        self.entries.set(key, value)
+
+    def discard(self, key):
+        """Drop a single entry."""
+        self.entries.pop(key)
+
+    def invalidate(self):
+        """Drop every entry; called by write paths in this process."""
+        with self._lock:
+            self._versions = None
+            self._generation += 1
+            self.invalidations += 1
+            self.entries.clear()
+
+    def stats(self):
+        stats = self.entries.stats()
+        stats['invalidations'] = self.invalidations
+        return stats
@@ -0,0 +1,59 @@
+"""
+Per-worker cache for the catalog queries: locations, car listings, search
+facet counts and car details.
+
+Entries are evicted LRU-first once CATALOG_CACHE_SIZE is reached and expire
+after CATALOG_CACHE_TTL seconds. Admin writes in this process call
+invalidate(); writes from other workers or seeding scripts are picked up
+through the cars/locations change counters in table_versions, checked at
+most every CATALOG_CACHE_CHECK_INTERVAL seconds.
+
+Cached values are shared between requests and must not be mutated.
+"""
+
+import os
+
+import database
+from cache import VersionedCache
+
+CATALOG_CACHE_ENABLED = os.environ.get('CATALOG_CACHE', '1') == '1'
+CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 256))
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', 300))
+CATALOG_CACHE_CHECK_INTERVAL = float(os.environ.get('CATALOG_CACHE_CHECK_INTERVAL', 1))
+
+# Tables whose changes invalidate the catalog
+CATALOG_TABLES = ('cars', 'locations')
+
+catalog_cache = VersionedCache(
+    CATALOG_TABLES, CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL, CATALOG_CACHE_CHECK_INTERVAL
+)
+
+def get_all_locations():
+    """Cached database.get_all_locations()."""
+    if not CATALOG_CACHE_ENABLED:
+        return database.get_all_locations()
+    return catalog_cache.get_or_load(('locations',), database.get_all_locations)
+
+def get_all_cars(**filters):
+    """Cached database.get_all_cars(); date-filtered searches bypass the cache."""
+    if not CATALOG_CACHE_ENABLED or filters.get('pickup_date') or filters.get('return_date'):
+        return database.get_all_cars(**filters)
+    key = ('cars', tuple(sorted(filters.items())))
+    return catalog_cache.get_or_load(key, lambda: database.get_all_cars(**filters))
+
+def get_car_facets(**filters):
+    """Cached database.get_car_facets(); date-filtered searches bypass the cache."""
+    if not CATALOG_CACHE_ENABLED or filters.get('pickup_date') or filters.get('return_date'):
+        return database.get_car_facets(**filters)
+    key = ('facets', tuple(sorted(filters.items())))
+    return catalog_cache.get_or_load(key, lambda: database.get_car_facets(**filters))
+
+def get_car_by_id(car_id):
+    """Cached database.get_car_by_id()."""
+    if not CATALOG_CACHE_ENABLED:
+        return database.get_car_by_id(car_id)
+    return catalog_cache.get_or_load(('car', car_id), lambda: database.get_car_by_id(car_id))
+
+def invalidate():
+    """Invalidate the catalog after an admin write."""
+    catalog_cache.invalidate()
@@ -0,0 +1,105 @@
+"""
+Check that the bookings export streams in constant memory.
+
+Generates two databases with generate_dataset.py, one with a tenth of the
+bookings of the other, and streams every booking out of each as CSV and
+NDJSON through GET /api/admin/bookings/export, plus the raw batches from
+iter_bookings_for_export(). Fails when a stream's row count differs from
+the bookings table, or when the peak Python memory (tracemalloc) of the
+large export is more than --ratio times that of the small one, i.e. when
+memory grows with the table instead of staying flat.
+
+Usage: python check_export_memory.py [--bookings 200000] [--ratio 2]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import database
+from generate_dataset import generate
+
+ADMIN_EMAIL = 'admin@carrental.com'
+ADMIN_PASSWORD = 'admin123'
+
+def measure(consume):
+    """(rows, peak bytes) of consume() under tracemalloc."""
+    tracemalloc.start()
+    try:
+        rows = consume()
+        return rows, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def stream_rows(client, export_format):
+    response = client.get(f'/api/admin/bookings/export?format={export_format}', buffered=False)
+    assert response.status_code == 200, response.status_code
+    lines = 0
+    try:
+        for chunk in response.response:
+            lines += chunk.count(b'\n' if isinstance(chunk, bytes) else '\n')
+    finally:
+        response.close()
+    # The CSV has a header line
+    return lines - 1 if export_format == 'csv' else lines
+
+def batch_rows():
+    return sum(len(rows) for rows in database.iter_bookings_for_export())
+
+def check(path, bookings):
+    generate(path, 20, 200, 1_000, bookings)
+    # Imported late: app migrates whatever DATABASE_PATH is when it loads
+    from app import app
+
+    database.get_pool().close_all()
+    conn = database.get_db_connection()
+    expected = conn.execute('SELECT COUNT(*) FROM bookings').fetchone()[0]
+    conn.close()
+
+    client = app.test_client()
+    response = client.post('/api/login', json={'email': ADMIN_EMAIL, 'password': ADMIN_PASSWORD})
+    assert response.status_code == 200, response.status_code
+
+    results = {}
+    for name, consume in (
+        ('csv', lambda: stream_rows(client, 'csv')),
+        ('ndjson', lambda: stream_rows(client, 'ndjson')),
+        ('batches', batch_rows),
+    ):
+        rows, peak = measure(consume)
+        results[name] = (rows, peak)
+        print(f"  {name:8} {rows:>9} of {expected} rows, peak {peak / 1024:,.0f} KiB")
+    database.get_pool().close_all()
+    return expected, results
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the bookings export streams in constant memory.')
+    parser.add_argument('--bookings', type=int, default=200_000, help='bookings in the large dataset')
+    parser.add_argument('--ratio', type=float, default=2.0,
+                        help='largest allowed large/small peak memory ratio')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    failed = False
+    peaks = {}
+    for label, bookings in (('small', args.bookings // 10), ('large', args.bookings)):
+        print(f"{label}: generating {bookings} bookings")
+        expected, results = check(os.path.join(directory, f'{label}.db'), bookings)
+        for name, (rows, peak) in results.items():
+            if rows != expected:
+                print(f"FAIL {label} {name}: {rows} rows exported, {expected} in the table")
+                failed = True
+            peaks.setdefault(name, []).append(peak)
+
+    for name, (small, large) in peaks.items():
+        ratio = large / small
+        print(f"{name}: peak memory x{ratio:.2f} for 10x the bookings")
+        if ratio > args.ratio:
+            print(f"FAIL {name}: peak memory grows with the table (limit x{args.ratio})")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Check that every query in database.py is served by an index.
+
+Builds a fresh database from schema.sql and the migrations, calls each
+query function, captures the SQL it runs and prints its EXPLAIN QUERY PLAN.
+Exits with status 1 if a query scans bookings/cars without an index or
+needs a temporary B-tree to sort. Full-text searches may sort their
+matches by relevance, and facet counts group the matching cars by several
+columns and a computed price bucket; no index can provide either order, so
+those sorts are shown but allowed. A facet query that scans cars still
+fails.
+
+Usage: python check_query_plans.py
+"""
+
+import os
+import sys
+import tempfile
+
+import database
+from slow_queries import bad_plan_lines
+
+def capture_queries(calls):
+    """Run each call and return the SELECT statements it executed."""
+    statements = []
+    conn = database.get_db_connection()
+    conn.set_trace_callback(statements.append)
+    conn.close()
+    captured = []
+    for name, call in calls:
+        del statements[:]
+        call()
+        for sql in statements:
+            if sql.lstrip().upper().startswith('SELECT'):
+                captured.append((name, sql))
+    conn = database.get_db_connection()
+    conn.set_trace_callback(None)
+    conn.close()
+    return captured
+
+def main():
+    tmpdir = tempfile.mkdtemp()
+    database.DATABASE_PATH = os.path.join(tmpdir, 'plans.db')
+    database.DB_POOL_SIZE = 1
+    database.init_db()
+
+    calls = [
+        ('get_user_by_email', lambda: database.get_user_by_email('admin@carrental.com')),
+        ('get_user_by_id', lambda: database.get_user_by_id(1)),
+        ('get_all_locations', lambda: database.get_all_locations()),
+        ('get_location_by_id', lambda: database.get_location_by_id(1)),
+        ('get_all_cars', lambda: database.get_all_cars()),
+        ('get_all_cars(location)', lambda: database.get_all_cars(location_id=1)),
+        ('get_all_cars(type)', lambda: database.get_all_cars(car_type='SUV')),
+        ('get_all_cars(price)', lambda: database.get_all_cars(min_price=50, max_price=150)),
+        ('get_all_cars(dates)', lambda: database.get_all_cars(pickup_date='2030-01-01', return_date='2030-01-05')),
+        ('get_all_cars(page)', lambda: database.get_all_cars(limit=20, after=(80.0, 5))),
+        ('get_all_cars(q)', lambda: database.get_all_cars(q='suv diesel', limit=20)),
+        ('get_all_cars(q, page)', lambda: database.get_all_cars(q='suv', limit=20, after=(-1.5, 5))),
+        ('get_all_cars(fuel)', lambda: database.get_all_cars(fuel_type='Diesel')),
+        ('get_all_cars(transmission)', lambda: database.get_all_cars(transmission='Automatic')),
+        ('get_all_cars(city)', lambda: database.get_all_cars(city='Mumbai')),
+        ('get_all_cars(city, fuel, page)', lambda: database.get_all_cars(
+            city='Mumbai', fuel_type='Diesel', transmission='Automatic', limit=20, after=(80.0, 5))),
+        ('get_car_facets', lambda: database.get_car_facets()),
+        ('get_car_facets(location)', lambda: database.get_car_facets(location_id=1)),
+        ('get_car_facets(filters)', lambda: database.get_car_facets(
+            car_type='SUV', fuel_type='Diesel', transmission='Automatic', city='Mumbai',
+            min_price=50, max_price=150)),
+        ('get_car_facets(q)', lambda: database.get_car_facets(q='suv diesel')),
+        ('get_car_facets(dates)', lambda: database.get_car_facets(pickup_date='2030-01-01', return_date='2030-01-05')),
+        ('get_car_by_id', lambda: database.get_car_by_id(1)),
+        ('check_car_availability', lambda: database.check_car_availability(1, '2030-01-01', '2030-01-05')),
+        ('get_availability_matrix', lambda: database.get_availability_matrix([1, 2, 3], [('2030-01-01', '2030-01-05')])),
+        ('get_user_bookings', lambda: database.get_user_bookings(1)),
+        ('get_user_bookings(page)', lambda: database.get_user_bookings(1, limit=20, after=('2030-01-01 00:00:00', 5))),
+        ('get_booking_by_id', lambda: database.get_booking_by_id(1)),
+        ('cancel_booking', lambda: database.cancel_booking(1, 1)),
+        ('get_all_bookings', lambda: database.get_all_bookings()),
+        ('iter_bookings_for_export', lambda: list(database.iter_bookings_for_export('2030-01-01', '2030-12-31'))),
+        ('get_all_bookings(page)', lambda: database.get_all_bookings(limit=20, after=('2030-01-01 00:00:00', 5))),
+    ]
+
+    conn = database.get_db_connection()
+    failures = 0
+    for name, sql in capture_queries(calls):
+        plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        bad = bad_plan_lines(plan, sql)
+        status = 'FAIL' if bad else 'ok'
+        failures += bool(bad)
+        print(f"[{status}] {name}")
+        for line in plan:
+            print(f"         {line}")
+    conn.close()
+
+    print("")
+    print(f"{failures} quer{'y' if failures == 1 else 'ies'} without a usable index")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,200 @@
 import sqlite3
 import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_right
 from datetime import datetime
 
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'car_rental.db')
+DATABASE_PATH = os.environ.get(
+    'DATABASE_PATH', os.path.join(os.path.dirname(__file__), 'car_rental.db')
+)
+
+# Connection pool settings (override through environment variables)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -16000)),  # negative = KiB
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 64 * 1024 * 1024)),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+}
+
+# Retries for write transactions that still find the database locked
+# after busy_timeout, with exponential backoff starting at BOOKING_RETRY_BACKOFF seconds
+BOOKING_MAX_RETRIES = int(os.environ.get('BOOKING_MAX_RETRIES', 5))
+BOOKING_RETRY_BACKOFF = float(os.environ.get('BOOKING_RETRY_BACKOFF', 0.05))
+
+class BookingConflictError(Exception):
+    """The car already has a confirmed booking overlapping the requested dates."""
+
+# Callbacks timing SQL on pooled connections, as listener(sql, seconds, executions).
+# executions is 1 when a statement runs and 0 for the time spent fetching its
+# rows, so summing both gives statement counts and total SQL time.
+QUERY_LISTENERS = []
+
+def _notify_query_listeners(sql, seconds, executions):
+    for listener in QUERY_LISTENERS:
+        listener(sql, seconds, executions)
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor reporting execute and fetch times to QUERY_LISTENERS."""
+
+    sql = None
+
+    def _timed(self, method, sql, executions, *args):
+        if not QUERY_LISTENERS:
+            return method(*args)
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            _notify_query_listeners(sql, time.perf_counter() - start, executions)
+
+    def execute(self, sql, parameters=()):
+        self.sql = sql
+        return self._timed(super().execute, sql, 1, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.sql = sql
+        return self._timed(super().executemany, sql, 1, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed(super().fetchone, self.sql, 0)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        return self._timed(super().fetchmany, self.sql, 0, size)
+
+    def fetchall(self):
+        return self._timed(super().fetchall, self.sql, 0)
+
+    def __next__(self):
+        return self._timed(super().__next__, self.sql, 0)
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection whose close() hands it back to its pool.
+
+    Statements run through execute()/executemany() or its cursors are timed
+    for QUERY_LISTENERS.
+    """
+
+    pool = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        # Connection.execute() doesn't go through Cursor.execute()
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def discard(self):
+        """Really close the underlying connection."""
+        self.pool = None
+        super().close()
+
+class ConnectionPool:
+    """Per-process pool of long-lived, pre-tuned SQLite connections.
+
+    Connections are created on demand and up to ``size`` idle ones are kept
+    for reuse. The pool resets itself after a fork so gunicorn workers never
+    share a connection with the master process.
+    """
+
+    def __init__(self, database, size=DB_POOL_SIZE, pragmas=None):
+        self.database = database
+        self.size = size
+        self.pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.created = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            factory=PooledConnection,
+            timeout=self.pragmas.get('busy_timeout', 5000) / 1000,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        conn.pool = self
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            # Connections inherited from the parent must not be used or closed here
+            with self._lock:
+                self._idle = []
+                self._pid = os.getpid()
+
+    def acquire(self):
+        """Take an idle connection or open a new one."""
+        self._check_fork()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full."""
+        if conn.in_transaction:
+            conn.rollback()
+        if os.getpid() == self._pid:
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(conn)
+                    return
+        conn.discard()
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.discard()
+
+    def stats(self):
+        with self._lock:
+            return {'size': self.size, 'idle': len(self._idle), 'created': self.created}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the connection pool for DATABASE_PATH, creating it if needed."""
+    global _pool
+    if _pool is None or _pool.database != DATABASE_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.database != DATABASE_PATH:
+                if _pool is not None:
+                    _pool.close_all()
+                _pool = ConnectionPool(DATABASE_PATH, DB_POOL_SIZE)
+    return _pool
 
 def get_db_connection():
-    """Create and return a database connection."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return a pooled database connection. Calling close() releases it."""
+    return get_pool().acquire()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
 
 def init_db():
-    """Initialize the database with schema."""
+    """Initialize the database with schema and apply migrations."""
     conn = get_db_connection()
     
     # Read and execute schema
@@ -21,8 +204,79 @@ def init_db():
     
     conn.commit()
     conn.close()
+    migrate_db()
     print("Database initialized successfully!")
 
+def get_migrations():
+    """Return (version, path) pairs for the numbered migration files, in order."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if filename.endswith('.sql'):
+            version = int(filename.split('_', 1)[0])
+            migrations.append((version, os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+def split_sql(script):
+    """Split a SQL script into complete statements (trigger bodies included)."""
+    statements = []
+    current = ''
+    for piece in script.split(';'):
+        current += piece + ';'
+        if sqlite3.complete_statement(current):
+            if current.strip(' \t\r\n;'):
+                statements.append(current.strip())
+            current = ''
+    return statements
+
+def migrate_db():
+    """Apply pending migrations, tracked through PRAGMA user_version.
+
+    All pending migrations run inside one IMMEDIATE transaction, so workers
+    starting at the same time apply each migration exactly once.
+    """
+    conn = get_db_connection()
+    applied = []
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        current = conn.execute('PRAGMA user_version').fetchone()[0]
+        for version, path in get_migrations():
+            if version <= current:
+                continue
+            with open(path, 'r') as f:
+                for statement in split_sql(f.read()):
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            applied.append(version)
+        conn.commit()
+    finally:
+        conn.close()
+    if applied:
+        print(f"Applied database migrations: {', '.join(map(str, applied))}")
+    return applied
+
+def get_table_versions(*names):
+    """Return the change counters of the given tables, e.g. {'cars': 12}."""
+    conn = get_db_connection()
+    placeholders = ', '.join('?' * len(names))
+    rows = conn.execute(
+        f'SELECT name, version FROM table_versions WHERE name IN ({placeholders})', names
+    ).fetchall()
+    conn.close()
+    return {row['name']: row['version'] for row in rows}
+
+def _read_table_version(conn, name):
+    """Read a table's change counter on an existing connection/transaction."""
+    row = conn.execute('SELECT version FROM table_versions WHERE name = ?', (name,)).fetchone()
+    return row['version'] if row else 0
+
+# Callbacks run after a booking is created or cancelled, as
+# listener(event, booking, bookings_version); used by in-process caches
+BOOKING_LISTENERS = []
+
+def _notify_booking_listeners(event, booking, version):
+    for listener in BOOKING_LISTENERS:
+        listener(event, booking, version)
+
 # User operations
 def create_user(email, password_hash, full_name, phone, is_admin=0):
     """Create a new user."""
@@ -55,6 +309,25 @@ def get_user_by_id(user_id):
     conn.close()
     return dict(user) if user else None
 
+# Columns returned to clients for a user (never the password hash)
+USER_PROFILE_COLUMNS = ('id', 'email', 'full_name', 'phone', 'is_admin')
+
+def get_user_profile(user_id):
+    """Get the public profile columns of a user by ID."""
+    conn = get_db_connection()
+    user = conn.execute(
+        f"SELECT {', '.join(USER_PROFILE_COLUMNS)} FROM users WHERE id = ?", (user_id,)
+    ).fetchone()
+    conn.close()
+    return dict(user) if user else None
+
+def update_user_password_hash(user_id, password_hash):
+    """Replace a user's stored password hash."""
+    conn = get_db_connection()
+    conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+    conn.commit()
+    conn.close()
+
 # Location operations
 def get_all_locations():
     """Get all locations."""
@@ -71,43 +344,215 @@ def get_location_by_id(location_id):
     return dict(location) if location else None
 
 # Car operations
-def get_all_cars(location_id=None, car_type=None, min_price=None, max_price=None, available_only=True):
-    """Get cars with optional filters."""
-    conn = get_db_connection()
-    
-    query = '''
-        SELECT cars.*, locations.name as location_name, locations.city 
-        FROM cars 
-        JOIN locations ON cars.location_id = locations.id 
-        WHERE 1=1
-    '''
+# Two date ranges overlap when each starts on or before the other ends
+BOOKING_OVERLAP_SQL = '''
+    bookings.status = 'confirmed'
+    AND bookings.pickup_date <= ?
+    AND bookings.return_date >= ?
+'''
+
+# Words of a free-text car search
+SEARCH_TERM = re.compile(r'\w+', re.UNICODE)
+
+def fts_match_query(q):
+    """FTS5 MATCH expression for free text: every word, as a prefix, must match.
+
+    Words are quoted, so FTS5 operators in user input are searched as text.
+    Returns None when q has no words.
+    """
+    terms = SEARCH_TERM.findall(q or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def car_filter_sql(location_id=None, car_type=None, fuel_type=None, transmission=None, seats=None,
+                   city=None, min_price=None, max_price=None, available_only=True,
+                   pickup_date=None, return_date=None, q=None):
+    """WHERE conditions and parameters for the car search filters.
+
+    Expects cars joined to locations. When pickup_date and return_date are
+    given, cars with an overlapping confirmed booking are excluded; q keeps
+    only cars matching that free text in cars_fts.
+    """
+    conditions = []
     params = []
     
-    if available_only:
-        query += ' AND cars.available = 1'
+    match = fts_match_query(q)
+    if q is not None and match is None:
+        # Nothing searchable in q matches nothing
+        conditions.append('0')
+    elif match:
+        conditions.append('cars.id IN (SELECT rowid FROM cars_fts WHERE cars_fts MATCH ?)')
+        params.append(match)
     
-    if location_id:
-        query += ' AND cars.location_id = ?'
-        params.append(location_id)
+    if available_only:
+        conditions.append('cars.available = 1')
     
-    if car_type:
-        query += ' AND cars.car_type = ?'
-        params.append(car_type)
+    for column, value in (('cars.location_id', location_id), ('cars.car_type', car_type),
+                          ('cars.fuel_type', fuel_type), ('cars.transmission', transmission),
+                          ('cars.seats', seats), ('locations.city', city)):
+        if value:
+            conditions.append(f'{column} = ?')
+            params.append(value)
     
     if min_price is not None:
-        query += ' AND cars.price_per_day >= ?'
+        conditions.append('cars.price_per_day >= ?')
         params.append(min_price)
     
     if max_price is not None:
-        query += ' AND cars.price_per_day <= ?'
+        conditions.append('cars.price_per_day <= ?')
         params.append(max_price)
     
-    query += ' ORDER BY cars.price_per_day'
+    if pickup_date and return_date:
+        conditions.append(f'''NOT EXISTS (
+                SELECT 1 FROM bookings
+                WHERE bookings.car_id = cars.id AND {BOOKING_OVERLAP_SQL}
+            )''')
+        params.extend([return_date, pickup_date])
+    
+    return conditions, params
+
+def get_all_cars(location_id=None, car_type=None, min_price=None, max_price=None, available_only=True,
+                 pickup_date=None, return_date=None, limit=None, after=None,
+                 fuel_type=None, transmission=None, seats=None, city=None, q=None):
+    """Get cars with optional filters, ordered by (price_per_day, id).
+
+    When pickup_date and return_date are given, only cars without an
+    overlapping confirmed booking are returned. For keyset pagination pass
+    limit and after, the (price_per_day, id) of the last car already seen.
+
+    With q, only cars matching that text (see fts_match_query) are returned,
+    best BM25 match first: ordered by (search_rank, id), which after then
+    refers to.
+    """
+    conditions, params = car_filter_sql(
+        location_id=location_id, car_type=car_type, fuel_type=fuel_type,
+        transmission=transmission, seats=seats, city=city, min_price=min_price,
+        max_price=max_price, available_only=available_only,
+        pickup_date=pickup_date, return_date=return_date
+    )
+    match = fts_match_query(q)
+    if q is not None and match is None:
+        return []
+    
+    if match:
+        # rank is bm25() with the column weights set in the cars_fts migration
+        query = '''
+            SELECT cars.*, locations.name as location_name, locations.city,
+                   search.rank as search_rank
+            FROM (SELECT rowid, rank FROM cars_fts WHERE cars_fts MATCH ?) AS search
+            JOIN cars ON cars.id = search.rowid
+            JOIN locations ON cars.location_id = locations.id 
+        '''
+        params.insert(0, match)
+        order = ('search.rank', 'cars.id')
+    else:
+        query = '''
+            SELECT cars.*, locations.name as location_name, locations.city 
+            FROM cars 
+            JOIN locations ON cars.location_id = locations.id 
+        '''
+        order = ('cars.price_per_day', 'cars.id')
+    
+    if after is not None:
+        conditions.append(f'({order[0]}, {order[1]}) > (?, ?)')
+        params.extend(after)
+    
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    
+    query += f' ORDER BY {order[0]}, {order[1]}'
     
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+    
+    conn = get_db_connection()
     cars = conn.execute(query, params).fetchall()
     conn.close()
     return [dict(car) for car in cars]
 
+# Facet name -> column counted by get_car_facets
+CAR_FACETS = {
+    'car_type': 'cars.car_type',
+    'fuel_type': 'cars.fuel_type',
+    'transmission': 'cars.transmission',
+    'seats': 'cars.seats',
+    'city': 'locations.city',
+}
+
+# Width of the price histogram buckets, per day
+FACET_PRICE_BUCKET = float(os.environ.get('FACET_PRICE_BUCKET', 50))
+
+def get_car_facets(location_id=None, car_type=None, fuel_type=None, transmission=None, seats=None,
+                   city=None, min_price=None, max_price=None, available_only=True,
+                   pickup_date=None, return_date=None, q=None, price_bucket=FACET_PRICE_BUCKET):
+    """Count the cars matching a search, per facet value and price bucket.
+
+    Returns {'total': n, 'facets': {facet: [{'value', 'count'}], 'price': [{'min', 'max', 'count'}]}}.
+    Each facet is counted with every filter except its own, so the counts
+    say how many cars picking that value would give; the price histogram
+    likewise ignores min_price/max_price.
+
+    Everything comes from one GROUP BY over the cars matching the
+    non-facet filters, grouped by all facet columns, the price bucket and
+    whether the price is in range; the few resulting rows are then summed
+    per facet here.
+    """
+    selected = {'car_type': car_type, 'fuel_type': fuel_type, 'transmission': transmission,
+                'seats': seats, 'city': city}
+    conditions, params = car_filter_sql(
+        location_id=location_id, available_only=available_only,
+        pickup_date=pickup_date, return_date=return_date, q=q
+    )
+    price_conditions, price_params = car_filter_sql(
+        min_price=min_price, max_price=max_price, available_only=False
+    )
+    in_range = ' AND '.join(price_conditions) or '1'
+    
+    columns = ', '.join(CAR_FACETS.values())
+    query = f'''
+        SELECT {columns},
+               CAST(cars.price_per_day / ? AS INTEGER) AS price_bucket,
+               {in_range} AS in_range,
+               COUNT(*) AS count
+        FROM cars
+        JOIN locations ON cars.location_id = locations.id
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        GROUP BY {columns}, price_bucket, in_range
+    '''
+    conn = get_db_connection()
+    groups = conn.execute(query, [price_bucket] + price_params + params).fetchall()
+    conn.close()
+    
+    names = list(CAR_FACETS)
+    counts = {name: {} for name in names}
+    buckets = {}
+    total = 0
+    for row in groups:
+        # Facet filters this group fails
+        misses = {name for name in names if selected[name] and row[name] != selected[name]}
+        if not misses and row['in_range']:
+            total += row['count']
+        for name in names:
+            if not misses - {name} and row['in_range']:
+                value = row[name]
+                counts[name][value] = counts[name].get(value, 0) + row['count']
+        if not misses:
+            buckets[row['price_bucket']] = buckets.get(row['price_bucket'], 0) + row['count']
+    
+    facets = {}
+    for name in names:
+        values = sorted(counts[name].items(), key=lambda item: (-item[1], str(item[0])))
+        if name == 'seats':
+            values.sort(key=lambda item: item[0])
+        facets[name] = [{'value': value, 'count': count} for value, count in values]
+    facets['price'] = [
+        {'min': bucket * price_bucket, 'max': (bucket + 1) * price_bucket, 'count': count}
+        for bucket, count in sorted(buckets.items())
+    ]
+    return {'total': total, 'facets': facets}
+
 def get_car_by_id(car_id):
     """Get car by ID with location info."""
     conn = get_db_connection()
@@ -120,6 +565,13 @@ def get_car_by_id(car_id):
     conn.close()
     return dict(car) if car else None
 
+# Columns admins may change through update_car/update_cars
+CAR_UPDATABLE_COLUMNS = (
+    'name', 'brand', 'model', 'year', 'car_type', 'seats', 'transmission', 'fuel_type',
+    'price_per_day', 'location_id', 'image_url', 'description', 'features', 'available',
+    'fleet_code'
+)
+
 def add_car(name, brand, model, year, car_type, seats, transmission, fuel_type, 
             price_per_day, location_id, image_url, description, features):
     """Add a new car."""
@@ -137,7 +589,11 @@ def add_car(name, brand, model, year, car_type, seats, transmission, fuel_type,
     return car_id
 
 def update_car(car_id, **kwargs):
-    """Update car details."""
+    """Update car details. Raises ValueError for columns that can't be updated."""
+    unknown = set(kwargs) - set(CAR_UPDATABLE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot update: {', '.join(sorted(unknown))}")
+    
     conn = get_db_connection()
     
     # Build dynamic update query
@@ -155,53 +611,159 @@ def update_car(car_id, **kwargs):
     values.append(car_id)
     query = f"UPDATE cars SET {', '.join(fields)} WHERE id = ?"
     
-    conn.execute(query, values)
-    conn.commit()
-    conn.close()
+    try:
+        conn.execute(query, values)
+        conn.commit()
+    finally:
+        # Rolls back a failed UPDATE (e.g. a duplicate fleet_code)
+        conn.close()
     return True
 
+def update_cars(updates):
+    """Apply many car updates in one transaction.
+
+    updates is a list of (car_id, {column: value}). Rows changing the same set
+    of columns share one executemany. Returns {car_id: 'updated' | 'not_found'}.
+    Raises ValueError for columns that can't be updated.
+    """
+    groups = {}
+    for car_id, fields in updates:
+        unknown = set(fields) - set(CAR_UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot update: {', '.join(sorted(unknown))}")
+        columns = tuple(sorted(fields))
+        groups.setdefault(columns, []).append(
+            tuple(fields[column] for column in columns) + (car_id,)
+        )
+    
+    car_ids = [car_id for car_id, _ in updates]
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        existing = set()
+        for start in range(0, len(car_ids), 500):
+            chunk = car_ids[start:start + 500]
+            existing.update(row['id'] for row in conn.execute(
+                f"SELECT id FROM cars WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        for columns, params in groups.items():
+            query = f"UPDATE cars SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?"
+            conn.executemany(query, [row for row in params if row[-1] in existing])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return {car_id: 'updated' if car_id in existing else 'not_found' for car_id in car_ids}
+
 def check_car_availability(car_id, pickup_date, return_date):
     """Check if a car is available for the given dates."""
     conn = get_db_connection()
     
     # Check for overlapping bookings
-    overlapping = conn.execute('''
+    overlapping = conn.execute(f'''
         SELECT COUNT(*) as count FROM bookings 
-        WHERE car_id = ? 
-        AND status = 'confirmed'
-        AND (
-            (pickup_date <= ? AND return_date >= ?) OR
-            (pickup_date <= ? AND return_date >= ?) OR
-            (pickup_date >= ? AND return_date <= ?)
-        )
-    ''', (car_id, pickup_date, pickup_date, return_date, return_date, pickup_date, return_date)).fetchone()
+        WHERE bookings.car_id = ? AND {BOOKING_OVERLAP_SQL}
+    ''', (car_id, return_date, pickup_date)).fetchone()
     
     conn.close()
     return overlapping['count'] == 0
 
-# Booking operations
-def create_booking(user_id, car_id, pickup_date, return_date, pickup_location_id, 
-                   return_location_id, total_price):
-    """Create a new booking."""
+def get_availability_matrix(car_ids, windows):
+    """Check many cars against many date windows with a single query.
+
+    windows is a list of (pickup_date, return_date) pairs. Returns a dict
+    mapping each car id to a list of booleans, one per window.
+    """
+    matrix = {car_id: [True] * len(windows) for car_id in car_ids}
+    if not matrix or not windows:
+        return matrix
+    
+    # One range query covering every window, then resolve overlaps in memory
+    earliest = min(pickup for pickup, _ in windows)
+    latest = max(return_date for _, return_date in windows)
+    placeholders = ', '.join('?' * len(matrix))
     conn = get_db_connection()
-    cursor = conn.cursor()
+    rows = conn.execute(f'''
+        SELECT car_id, pickup_date, return_date FROM bookings
+        WHERE bookings.car_id IN ({placeholders}) AND {BOOKING_OVERLAP_SQL}
+        ORDER BY car_id, pickup_date
+    ''', [*matrix, latest, earliest]).fetchall()
+    conn.close()
     
-    cursor.execute('''
-        INSERT INTO bookings (user_id, car_id, pickup_date, return_date, 
-                            pickup_location_id, return_location_id, total_price)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (user_id, car_id, pickup_date, return_date, pickup_location_id, 
-          return_location_id, total_price))
+    # Per car: pickups in order plus the running max of return dates, so a
+    # window overlaps iff some booking starting before it ends returns after it starts
+    bookings_by_car = {}
+    for row in rows:
+        pickups, max_returns = bookings_by_car.setdefault(row['car_id'], ([], []))
+        pickups.append(row['pickup_date'])
+        max_returns.append(max(row['return_date'], max_returns[-1]) if max_returns else row['return_date'])
     
-    conn.commit()
-    booking_id = cursor.lastrowid
-    conn.close()
-    return booking_id
+    for car_id, (pickups, max_returns) in bookings_by_car.items():
+        flags = matrix[car_id]
+        for i, (pickup_date, return_date) in enumerate(windows):
+            started = bisect_right(pickups, return_date)
+            if started and max_returns[started - 1] >= pickup_date:
+                flags[i] = False
+    
+    return matrix
+
+# Booking operations
+def _is_busy(error):
+    return 'locked' in str(error) or 'busy' in str(error)
 
-def get_user_bookings(user_id):
-    """Get all bookings for a user."""
+def create_booking(user_id, car_id, pickup_date, return_date, pickup_location_id, 
+                   return_location_id, total_price):
+    """Create a new booking.
+
+    The overlap check and the insert run in one IMMEDIATE transaction, so
+    concurrent workers cannot double-book a car. Raises BookingConflictError
+    when the dates are taken; SQLITE_BUSY is retried with backoff.
+    """
+    for attempt in range(BOOKING_MAX_RETRIES + 1):
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            overlapping = conn.execute(f'''
+                SELECT 1 FROM bookings
+                WHERE bookings.car_id = ? AND {BOOKING_OVERLAP_SQL}
+                LIMIT 1
+            ''', (car_id, return_date, pickup_date)).fetchone()
+            if overlapping:
+                raise BookingConflictError(f'Car {car_id} is already booked for these dates')
+            
+            cursor = conn.execute('''
+                INSERT INTO bookings (user_id, car_id, pickup_date, return_date, 
+                                    pickup_location_id, return_location_id, total_price)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, car_id, pickup_date, return_date, pickup_location_id, 
+                  return_location_id, total_price))
+            booking_id = cursor.lastrowid
+            version = _read_table_version(conn, 'bookings')
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == BOOKING_MAX_RETRIES:
+                raise
+            delay = BOOKING_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+        else:
+            _notify_booking_listeners('created', {
+                'id': booking_id, 'car_id': car_id,
+                'pickup_date': pickup_date, 'return_date': return_date
+            }, version)
+            return booking_id
+        finally:
+            conn.close()
+        time.sleep(delay)
+
+def get_user_bookings(user_id, limit=None, after=None):
+    """Get bookings for a user, newest first.
+
+    For keyset pagination pass limit and after, the (created_at, id) of the
+    last booking already seen.
+    """
     conn = get_db_connection()
-    bookings = conn.execute('''
+    query = '''
         SELECT bookings.*, 
                cars.name as car_name, cars.brand, cars.model, cars.image_url,
                pl.name as pickup_location_name, pl.city as pickup_city,
@@ -211,8 +773,20 @@ def get_user_bookings(user_id):
         JOIN locations pl ON bookings.pickup_location_id = pl.id
         JOIN locations rl ON bookings.return_location_id = rl.id
         WHERE bookings.user_id = ?
-        ORDER BY bookings.created_at DESC
-    ''', (user_id,)).fetchall()
+    '''
+    params = [user_id]
+    
+    if after is not None:
+        query += ' AND (bookings.created_at, bookings.id) < (?, ?)'
+        params.extend(after)
+    
+    query += ' ORDER BY bookings.created_at DESC, bookings.id DESC'
+    
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+    
+    bookings = conn.execute(query, params).fetchall()
     conn.close()
     return [dict(booking) for booking in bookings]
 
@@ -251,21 +825,90 @@ def cancel_booking(booking_id, user_id):
         "UPDATE bookings SET status = 'cancelled' WHERE id = ?", 
         (booking_id,)
     )
+    version = _read_table_version(conn, 'bookings')
     conn.commit()
     conn.close()
+    _notify_booking_listeners('cancelled', dict(booking), version)
     return True
 
-def get_all_bookings():
-    """Get all bookings (admin only)."""
+def get_all_bookings(limit=None, after=None):
+    """Get all bookings, newest first (admin only).
+
+    For keyset pagination pass limit and after, the (created_at, id) of the
+    last booking already seen.
+    """
     conn = get_db_connection()
-    bookings = conn.execute('''
+    query = '''
         SELECT bookings.*, 
                users.full_name as user_name, users.email as user_email,
                cars.name as car_name
         FROM bookings
         JOIN users ON bookings.user_id = users.id
         JOIN cars ON bookings.car_id = cars.id
-        ORDER BY bookings.created_at DESC
-    ''').fetchall()
+    '''
+    params = []
+    
+    if after is not None:
+        query += ' WHERE (bookings.created_at, bookings.id) < (?, ?)'
+        params.extend(after)
+    
+    query += ' ORDER BY bookings.created_at DESC, bookings.id DESC'
+    
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+    
+    bookings = conn.execute(query, params).fetchall()
     conn.close()
     return [dict(booking) for booking in bookings]
+
+# Columns written by the admin bookings export, in order
+EXPORT_COLUMNS = [
+    'id', 'user_id', 'user_name', 'user_email', 'car_id', 'car_name',
+    'pickup_date', 'return_date', 'pickup_location_id', 'return_location_id',
+    'total_price', 'status', 'created_at'
+]
+
+def iter_bookings_for_export(date_from=None, date_to=None, batch_size=1000):
+    """Yield batches of booking rows (as tuples in EXPORT_COLUMNS order).
+
+    Rows are read with fetchmany so memory stays constant regardless of table
+    size. date_from/date_to filter on pickup_date, inclusive. The connection
+    is held until the generator is exhausted or closed.
+    """
+    query = '''
+        SELECT bookings.id, bookings.user_id,
+               users.full_name as user_name, users.email as user_email,
+               bookings.car_id, cars.name as car_name,
+               bookings.pickup_date, bookings.return_date,
+               bookings.pickup_location_id, bookings.return_location_id,
+               bookings.total_price, bookings.status, bookings.created_at
+        FROM bookings
+        JOIN users ON bookings.user_id = users.id
+        JOIN cars ON bookings.car_id = cars.id
+        WHERE 1=1
+    '''
+    params = []
+    
+    if date_from:
+        query += ' AND bookings.pickup_date >= ?'
+        params.append(date_from)
+    
+    if date_to:
+        query += ' AND bookings.pickup_date <= ?'
+        params.append(date_to)
+    
+    query += ' ORDER BY bookings.pickup_date, bookings.id'
+    
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
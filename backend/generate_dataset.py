@@ -0,0 +1,287 @@
+"""
+Deterministic synthetic databases for load and regression testing.
+
+Builds a fresh database at PATH with the normal schema, migrations and seed
+data, then bulk-inserts generated locations, cars, users and bookings. The
+same --seed and --start always produce the same generated rows.
+
+- Cars are modelled on data/cars.csv, with jittered prices and years.
+  Locations and cars get uneven popularity, so some are much busier than
+  others.
+- Each car's bookings never overlap and fit in --days from --start unless
+  the car is booked solid. Idle gaps shrink in the summer and December
+  peaks, rentals last 1-21 days (mostly 2-5), and each is booked a few days
+  to weeks ahead.
+- --one-way-ratio of rentals return to another location in the same
+  country, and --cancel-ratio are cancelled.
+- Every generated user is user<N>@example.com with password
+  GENERATED_PASSWORD. The seeded admin (admin@carrental.com / admin123)
+  is kept.
+
+Usage: python generate_dataset.py PATH [--size small|medium|large]
+           [--locations N] [--cars N] [--users N] [--bookings N]
+           [--seed 42] [--start YYYY-MM-DD] [--days 730] [--force]
+       DATABASE_PATH=PATH python app.py
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+import bcrypt
+
+import database
+from import_fleet import DATA_DIR, read_records
+from passwords import password_hasher
+
+GENERATED_PASSWORD = 'password123'
+BCRYPT_ALPHABET = './ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+
+# locations, cars, users, bookings
+SIZES = {
+    'small': (20, 500, 1_000, 10_000),
+    'medium': (50, 5_000, 20_000, 200_000),
+    'large': (200, 50_000, 200_000, 2_000_000),
+}
+
+INSERT_BATCH_SIZE = 50_000
+
+# Fixed, not derived from today, so a --seed gives the same database every day
+DEFAULT_START = date(2026, 1, 1)
+
+CITIES = [
+    ('New York', 'NY', 'USA'), ('Los Angeles', 'CA', 'USA'), ('Miami', 'FL', 'USA'),
+    ('Chicago', 'IL', 'USA'), ('San Francisco', 'CA', 'USA'), ('Boston', 'MA', 'USA'),
+    ('Seattle', 'WA', 'USA'), ('Austin', 'TX', 'USA'), ('Denver', 'CO', 'USA'),
+    ('Las Vegas', 'NV', 'USA'), ('Orlando', 'FL', 'USA'), ('Atlanta', 'GA', 'USA'),
+    ('Mumbai', 'Maharashtra', 'India'), ('Delhi', 'Delhi', 'India'),
+    ('Bangalore', 'Karnataka', 'India'), ('Hyderabad', 'Telangana', 'India'),
+    ('Chennai', 'Tamil Nadu', 'India'), ('Pune', 'Maharashtra', 'India'),
+    ('Goa', 'Goa', 'India'), ('Jaipur', 'Rajasthan', 'India'),
+]
+BRANCHES = ['Airport', 'Downtown', 'Central Station', 'Harbour', 'University',
+            'Business Park', 'Old Town', 'Mall']
+FIRST_NAMES = ['Alex', 'Sam', 'Priya', 'Jordan', 'Taylor', 'Arjun', 'Maria', 'Chen',
+               'Aisha', 'Diego', 'Noor', 'Kai', 'Ravi', 'Elena', 'Omar', 'Grace']
+LAST_NAMES = ['Smith', 'Patel', 'Garcia', 'Kim', 'Singh', 'Johnson', 'Nguyen', 'Khan',
+              'Brown', 'Iyer', 'Lopez', 'Müller', 'Rossi', 'Sato', 'Okafor', 'Silva']
+
+# Relative demand by month; gaps between rentals shrink when demand is high
+MONTH_DEMAND = [0.7, 0.7, 0.8, 0.9, 1.0, 1.3, 1.5, 1.5, 1.0, 0.9, 0.8, 1.3]
+
+def timestamp(moment):
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def gen_locations(rng, count, created_at):
+    for i in range(count):
+        city, state, country = CITIES[i % len(CITIES)]
+        branch = BRANCHES[(i // len(CITIES)) % len(BRANCHES)]
+        cycle = i // (len(CITIES) * len(BRANCHES))
+        name = f'{city} {branch}' + (f' {cycle + 1}' if cycle else '')
+        address = f'{rng.randint(1, 999)} {branch} Road, {city}'
+        yield (name, city, state, country, address, created_at)
+
+def gen_cars(rng, count, location_ids, templates, created_at):
+    # A few locations hold most of the fleet
+    weights = [rng.paretovariate(1.5) for _ in location_ids]
+    for i in range(count):
+        t = rng.choice(templates)
+        price = round(float(t['price_per_day']) * rng.uniform(0.8, 1.25), 2)
+        yield (
+            f'GEN-{i + 1:07d}', t['name'], t['brand'], t['model'], rng.randint(2018, 2025),
+            t['car_type'], int(t['seats']), t['transmission'], t['fuel_type'], price,
+            rng.choices(location_ids, weights)[0], t['image_url'], t['description'],
+            t['features'], 0 if rng.random() < 0.03 else 1, created_at,
+        )
+
+def gen_users(rng, count, password_hash, joined_from):
+    for i in range(count):
+        full_name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        phone = f'+1-555-{rng.randint(0, 9999):04d}'
+        joined = joined_from + timedelta(seconds=rng.randint(0, 365 * 86400))
+        yield (f'user{i + 1}@example.com', password_hash, full_name, phone, 0, timestamp(joined))
+
+def split_total(rng, total, count):
+    """Split total into count parts with uneven (lognormal) weights."""
+    weights = [rng.lognormvariate(0, 0.6) for _ in range(count)]
+    scale = total / sum(weights)
+    parts = [int(w * scale) for w in weights]
+    for i in rng.sample(range(count), total - sum(parts)):
+        parts[i] += 1
+    return parts
+
+def gen_bookings(rng, cars, user_ids, locations_by_country, location_country,
+                 total, start, days, cancel_ratio, one_way_ratio):
+    """Yield bookings car by car; each car's timeline never overlaps itself."""
+    for (car_id, price, location_id), n in zip(cars, split_total(rng, total, len(cars))):
+        if not n:
+            continue
+        lengths = [min(21, max(1, int(rng.lognormvariate(1.2, 0.6)))) for _ in range(n)]
+        # Spread the car's idle days over the window, less of them in busy months
+        idle = max(0, days - sum(lengths) - n)
+        weights = [
+            rng.expovariate(1) / MONTH_DEMAND[(start + timedelta(days=days * i // n)).month - 1]
+            for i in range(n)
+        ]
+        scale = idle / sum(weights)
+        day = start
+        for length, weight in zip(lengths, weights):
+            pickup = day + timedelta(days=int(weight * scale))
+            return_day = pickup + timedelta(days=length)
+            # Next pickup is the day after the return at the earliest
+            day = return_day + timedelta(days=1)
+
+            if rng.random() < one_way_ratio:
+                country = location_country[location_id]
+                return_location = rng.choice(locations_by_country[country])
+            else:
+                return_location = location_id
+            # Frequent renters account for a large share of bookings
+            user_id = user_ids[int(len(user_ids) * rng.random() ** 2)]
+            created = datetime.combine(pickup, datetime.min.time()) - timedelta(
+                days=min(120, rng.expovariate(1 / 14)), seconds=rng.randint(0, 86399)
+            )
+            status = 'cancelled' if rng.random() < cancel_ratio else 'confirmed'
+            yield (user_id, car_id, pickup.isoformat(), return_day.isoformat(), location_id,
+                   return_location, round(price * length, 2), status, timestamp(created))
+
+def insert_many(conn, sql, rows):
+    """executemany in batches of INSERT_BATCH_SIZE, one transaction each."""
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            with conn:
+                conn.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        with conn:
+            conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+def generate(path, locations, cars, users, bookings, seed=42, start=DEFAULT_START, days=730,
+             cancel_ratio=0.12, one_way_ratio=0.15):
+    """Build a database at path. Returns a dict of generated row counts."""
+    rng = random.Random(seed)
+
+    # Normal schema, migrations and seed data
+    database.DATABASE_PATH = path
+    database.init_db()
+    database.get_pool().close_all()
+
+    first_day = datetime.combine(start, datetime.min.time())
+    opened = timestamp(first_day - timedelta(days=400))
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -200000')
+    try:
+        # Seed rows are stamped with the build time; pin them like the rest
+        with conn:
+            for table in ('locations', 'cars', 'users'):
+                conn.execute(f'UPDATE {table} SET created_at = ?', (opened,))
+        counts = {}
+        counts['locations'] = insert_many(conn, '''
+            INSERT INTO locations (name, city, state, country, address, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', gen_locations(rng, locations, opened))
+        location_rows = conn.execute('SELECT id, country FROM locations ORDER BY id').fetchall()
+        location_country = dict(location_rows)
+        locations_by_country = {}
+        for location_id, country in location_rows:
+            locations_by_country.setdefault(country, []).append(location_id)
+
+        templates = list(read_records(os.path.join(DATA_DIR, 'cars.csv')))
+        counts['cars'] = insert_many(conn, '''
+            INSERT INTO cars (fleet_code, name, brand, model, year, car_type, seats, transmission,
+                              fuel_type, price_per_day, location_id, image_url, description,
+                              features, available, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', gen_cars(rng, cars, list(location_country), templates, opened))
+
+        # One real bcrypt hash shared by every generated user, salted from the seed
+        # (the 22nd salt character only carries two bits)
+        salt = ''.join(rng.choice(BCRYPT_ALPHABET) for _ in range(21)) + rng.choice('.Oeu')
+        password_hash = bcrypt.hashpw(
+            GENERATED_PASSWORD.encode('utf-8'),
+            f'$2b${password_hasher.rounds:02d}${salt}'.encode('ascii')
+        ).decode('utf-8')
+        counts['users'] = insert_many(conn, '''
+            INSERT INTO users (email, password_hash, full_name, phone, is_admin, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', gen_users(rng, users, password_hash, first_day - timedelta(days=365)))
+
+        user_ids = [row[0] for row in conn.execute('SELECT id FROM users WHERE is_admin = 0 ORDER BY id')]
+        # Building the booking indexes once at the end beats updating them per row
+        indexes = conn.execute('''
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'bookings' AND sql IS NOT NULL
+        ''').fetchall()
+        with conn:
+            for name, _ in indexes:
+                conn.execute(f'DROP INDEX {name}')
+        car_rows = conn.execute('SELECT id, price_per_day, location_id FROM cars ORDER BY id').fetchall()
+        counts['bookings'] = insert_many(conn, '''
+            INSERT INTO bookings (user_id, car_id, pickup_date, return_date, pickup_location_id,
+                                  return_location_id, total_price, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', gen_bookings(rng, car_rows, user_ids, locations_by_country, location_country,
+                          bookings if user_ids else 0, start, days, cancel_ratio, one_way_ratio))
+
+        with conn:
+            for _, sql in indexes:
+                conn.execute(sql)
+
+        # Planner statistics, as a long-lived production database would have
+        conn.execute('ANALYZE')
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic car rental database.')
+    parser.add_argument('path', help='database file to create')
+    parser.add_argument('--size', choices=SIZES, default='small', help='preset row counts')
+    parser.add_argument('--locations', type=int)
+    parser.add_argument('--cars', type=int)
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--bookings', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--start', type=date.fromisoformat, default=DEFAULT_START,
+                        help=f'first pickup date (default: {DEFAULT_START})')
+    parser.add_argument('--days', type=int, default=730, help='days the bookings are spread over')
+    parser.add_argument('--cancel-ratio', type=float, default=0.12)
+    parser.add_argument('--one-way-ratio', type=float, default=0.15)
+    parser.add_argument('--force', action='store_true', help='overwrite an existing file')
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        if not args.force:
+            parser.error(f'{args.path} exists; pass --force to overwrite it')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+
+    preset = dict(zip(('locations', 'cars', 'users', 'bookings'), SIZES[args.size]))
+    sizes = {name: getattr(args, name) if getattr(args, name) is not None else preset[name]
+             for name in preset}
+
+    started = time.perf_counter()
+    counts = generate(args.path, seed=args.seed, start=args.start, days=args.days,
+                      cancel_ratio=args.cancel_ratio, one_way_ratio=args.one_way_ratio, **sizes)
+    elapsed = time.perf_counter() - started
+    print(f"Generated {args.path} in {elapsed:.1f}s "
+          f"({os.path.getsize(args.path) / 1024 / 1024:.1f} MB):")
+    for name, count in counts.items():
+        print(f"  {count:>10,} {name}")
+    print(f"Users log in as user<N>@example.com / {GENERATED_PASSWORD}")
+
+if __name__ == '__main__':
+    main()
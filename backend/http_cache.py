@@ -0,0 +1,71 @@
+"""
+Conditional GET support for JSON endpoints.
+
+ETags are derived from the change counters in table_versions plus the
+request path, query string and (for private responses) the session user, so
+If-None-Match can be answered with 304 before the view runs any query or
+serialises anything. The versions read for the ETag are also handed to the
+in-process caches (cache.observe_versions), so the body served under an
+ETag is never older than the versions it names.
+"""
+
+import hashlib
+import os
+from functools import wraps
+
+from flask import request, session, make_response
+
+import database
+from cache import observe_versions
+
+# max-age for public catalog responses; 0 means revalidate every time
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 0))
+
+def compute_etag(tables, private=False):
+    """Build a strong ETag for the current request from table versions."""
+    versions = database.get_table_versions(*tables)
+    # Drop cached bodies older than this ETag before the view reads them
+    observe_versions(versions)
+    parts = [
+        request.path,
+        request.query_string.decode('utf-8', 'replace'),
+        ','.join(f'{name}={versions.get(name, 0)}' for name in sorted(tables)),
+    ]
+    if private:
+        parts.append(f"user={session.get('user_id')}")
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+def conditional(tables, private=False):
+    """Decorator adding ETag/Cache-Control and answering If-None-Match with 304.
+
+    tables is a tuple of table names the response depends on, or a callable
+    returning one (evaluated per request).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            depends_on = tables() if callable(tables) else tables
+            etag = compute_etag(depends_on, private)
+            if private:
+                cache_control = 'private, no-cache'
+            elif CATALOG_MAX_AGE:
+                cache_control = f'public, max-age={CATALOG_MAX_AGE}'
+            else:
+                cache_control = 'public, no-cache'
+
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            if private:
+                response.vary.add('Cookie')
+            return response
+
+        return decorated_function
+
+    return decorator
@@ -0,0 +1,236 @@
+"""
+Responsive variants of the car photos.
+
+For every image in frontend/images/cars/ this writes resized copies at
+IMAGE_WIDTHS (never upscaling) into frontend/images/cars/variants/, each as
+WebP plus a JPEG (or PNG when the source has transparency) fallback, named
+after the whole source file name and a hash of its content and the
+encoding settings (foo.jpg -> foo-jpg-320.<hash>.webp), so foo.jpg and
+foo.png don't overwrite each other and static_assets.py can serve the
+variants as immutable. The resulting srcset strings are
+stored on every car using that image, in cars.image_srcset and
+cars.image_webp_srcset, so /api/cars returns them.
+
+Runs incrementally: images whose content hash matches variants/manifest.json
+and whose outputs exist are skipped. Changed images are processed in
+parallel on a process pool.
+
+Variants are only built here, at build time (build.sh, render.yaml). The
+admin car endpoints and import_fleet.py call refresh_srcsets() for the
+images of cars they create or change, which copies srcsets from the
+manifest for images that already have variants and leaves the rest NULL
+until the next build. Cars whose image isn't a local car photo get no
+srcsets.
+
+Usage: python image_variants.py [--workers N] [--force]   (run by build.sh)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+import database
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'images', 'cars')
+VARIANTS_DIR = os.path.join(IMAGES_DIR, 'variants')
+IMAGES_URL = '/images/cars'
+MANIFEST_NAME = 'manifest.json'
+
+# Bumped when variant names or encoding change, so every image is rebuilt
+VARIANT_FORMAT = 3
+IMAGE_WIDTHS = (320, 640, 960)
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def variant_hash(source_path):
+    """Short hash of a source image and the settings its variants are encoded with."""
+    settings = f'{VARIANT_FORMAT} {WEBP_QUALITY} {JPEG_QUALITY}'
+    return hashlib.sha256(f'{file_hash(source_path)} {settings}'.encode()).hexdigest()[:12]
+
+def make_variants(source_path, out_dir=VARIANTS_DIR, widths=IMAGE_WIDTHS):
+    """Write every width of one image; returns {'webp': [(file, w)], 'fallback': [(file, w)]}."""
+    stem, source_ext = os.path.splitext(os.path.basename(source_path))
+    stem = f'{stem}-{source_ext[1:]}'
+    digest = variant_hash(source_path)
+    outputs = {'webp': [], 'fallback': []}
+    with Image.open(source_path) as image:
+        image.load()
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        fallback_ext = '.png' if has_alpha else '.jpg'
+        if not has_alpha and image.mode != 'RGB':
+            image = image.convert('RGB')
+        # Always produce at least one variant, even for small sources
+        targets = [w for w in widths if w < image.width] or [image.width]
+        for width in targets:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+
+            webp_name = f'{stem}-{width}.{digest}.webp'
+            resized.save(os.path.join(out_dir, webp_name), 'WEBP', quality=WEBP_QUALITY, method=6)
+            outputs['webp'].append((webp_name, width))
+
+            fallback_name = f'{stem}-{width}.{digest}{fallback_ext}'
+            if has_alpha:
+                resized.save(os.path.join(out_dir, fallback_name), 'PNG', optimize=True)
+            else:
+                resized.save(os.path.join(out_dir, fallback_name), 'JPEG',
+                             quality=JPEG_QUALITY, optimize=True, progressive=True)
+            outputs['fallback'].append((fallback_name, width))
+    return outputs
+
+def srcset(files):
+    return ', '.join(f'{IMAGES_URL}/variants/{name} {width}w' for name, width in files)
+
+def load_manifest():
+    try:
+        with open(os.path.join(VARIANTS_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_manifest(manifest):
+    path = os.path.join(VARIANTS_DIR, MANIFEST_NAME)
+    with open(f'{path}.{os.getpid()}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f'{path}.{os.getpid()}.tmp', path)
+
+def output_names(entry):
+    return {name for files in entry['outputs'].values() for name, _ in files}
+
+def is_current(entry, digest):
+    if not entry or entry.get('hash') != digest or entry.get('format') != VARIANT_FORMAT:
+        return False
+    return all(os.path.exists(os.path.join(VARIANTS_DIR, name)) for name in output_names(entry))
+
+def remove_outputs(entry, keep=()):
+    """Delete an entry's variant files, except those in keep."""
+    for name in output_names(entry) - set(keep):
+        try:
+            os.remove(os.path.join(VARIANTS_DIR, name))
+        except FileNotFoundError:
+            pass
+
+def local_image(image_url):
+    """File name in IMAGES_DIR that image_url points at, or None."""
+    prefix = IMAGES_URL + '/'
+    if not image_url or not image_url.startswith(prefix):
+        return None
+    name = image_url[len(prefix):]
+    if '/' in name or not name.lower().endswith(SOURCE_EXTENSIONS):
+        return None
+    return name if os.path.isfile(os.path.join(IMAGES_DIR, name)) else None
+
+def built_entry(manifest, name):
+    """Manifest entry for one source image if its variants are on disk, else None."""
+    entry = manifest.get(name)
+    if not entry or entry.get('format') != VARIANT_FORMAT:
+        return None
+    if not all(os.path.exists(os.path.join(VARIANTS_DIR, variant)) for variant in output_names(entry)):
+        return None
+    return entry
+
+def refresh_srcsets(image_urls=None):
+    """Store srcsets on every car using one of image_urls (default: every car).
+
+    Only looks variants up in the manifest, never builds them, so it is
+    cheap enough for a request. Cars whose image has no variants yet get
+    NULL srcsets (the next build fills them in), so a car moved to another
+    image never keeps the old one's. Expects a migrated database. Returns
+    the number of cars changed.
+    """
+    try:
+        manifest = load_manifest()
+    except (OSError, ValueError):
+        # Unreadable manifest: no srcsets until the next build
+        manifest = {}
+    conn = database.get_db_connection()
+    try:
+        if image_urls is None:
+            image_urls = [row[0] for row in conn.execute('SELECT DISTINCT image_url FROM cars')]
+        rows = []
+        for image_url in set(image_urls):
+            name = local_image(image_url)
+            entry = built_entry(manifest, name) if name else None
+            if entry:
+                fallback, webp = srcset(entry['outputs']['fallback']), srcset(entry['outputs']['webp'])
+            else:
+                fallback = webp = None
+            rows.append((fallback, webp, image_url, fallback, webp))
+        cursor = conn.executemany('''
+            UPDATE cars SET image_srcset = ?, image_webp_srcset = ?
+            WHERE image_url = ?
+            AND (image_srcset IS NOT ? OR image_webp_srcset IS NOT ?)
+        ''', rows)
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def build_variants(workers=None, force=False):
+    """Process new or changed images and record srcsets on cars. Returns (built, skipped)."""
+    if Image is None:
+        raise RuntimeError('Pillow is required for image variants: pip install Pillow')
+    os.makedirs(VARIANTS_DIR, exist_ok=True)
+    manifest = load_manifest()
+
+    sources = sorted(
+        name for name in os.listdir(IMAGES_DIR)
+        if name.lower().endswith(SOURCE_EXTENSIONS) and os.path.isfile(os.path.join(IMAGES_DIR, name))
+    )
+    hashes = {name: file_hash(os.path.join(IMAGES_DIR, name)) for name in sources}
+    pending = [name for name in sources if force or not is_current(manifest.get(name), hashes[name])]
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(make_variants, [os.path.join(IMAGES_DIR, name) for name in pending])
+            for name, outputs in zip(pending, results):
+                entry = {'hash': hashes[name], 'format': VARIANT_FORMAT, 'outputs': outputs}
+                if name in manifest:
+                    remove_outputs(manifest[name], keep=output_names(entry))
+                manifest[name] = entry
+
+    # Forget images that were deleted, and their variants
+    for name in set(manifest) - set(hashes):
+        remove_outputs(manifest.pop(name))
+    save_manifest(manifest)
+
+    # The srcset columns arrive with migration 0004
+    database.migrate_db()
+    conn = database.get_db_connection()
+    conn.executemany('''
+        UPDATE cars SET image_srcset = ?, image_webp_srcset = ?
+        WHERE image_url = ?
+        AND (image_srcset IS NOT ? OR image_webp_srcset IS NOT ?)
+    ''', [
+        (srcset(entry['outputs']['fallback']), srcset(entry['outputs']['webp']),
+         f'{IMAGES_URL}/{name}',
+         srcset(entry['outputs']['fallback']), srcset(entry['outputs']['webp']))
+        for name, entry in manifest.items()
+    ])
+    conn.commit()
+    conn.close()
+    return len(pending), len(sources) - len(pending)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build responsive variants of car images.')
+    parser.add_argument('--workers', type=int, default=None, help='processes to use (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='rebuild every image')
+    args = parser.parse_args()
+
+    built, skipped = build_variants(args.workers, args.force)
+    print(f"Image variants: {built} processed, {skipped} unchanged")
@@ -0,0 +1,243 @@
+"""
+Bulk, idempotent import of locations and cars.
+
+Reads CSV, JSON (an array of objects) or JSON Lines files and upserts every
+record by its natural key: locations by (city, name), cars by fleet_code.
+Cars name their location with location_city + location_name (or give a
+location_id). Rows are written with executemany in batches of --batch-size,
+one transaction per batch, and a row only counts as updated when one of its
+values actually changed, so re-running an import is safe and cheap. When
+cars change, their image srcsets are refreshed from the variants already
+built; run image_variants.py to build variants for new images.
+
+Only the columns present in a file are written; e.g. a cars file without an
+available column never touches availability.
+
+Usage: python import_fleet.py [--locations data/locations.csv] [--cars data/cars.csv]
+                              [--batch-size 5000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+import database
+import image_variants
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+
+# column -> converter; the key columns come first
+LOCATION_KEY = ('city', 'name')
+LOCATION_COLUMNS = {
+    'city': str, 'name': str, 'country': str,
+    'state': str, 'address': str,
+}
+LOCATION_REQUIRED = ('city', 'name', 'country')
+
+CAR_KEY = ('fleet_code',)
+CAR_COLUMNS = {
+    'fleet_code': str, 'name': str, 'brand': str, 'model': str, 'year': int,
+    'car_type': str, 'seats': int, 'transmission': str, 'fuel_type': str,
+    'price_per_day': float, 'location_id': int,
+    'image_url': str, 'description': str, 'features': str, 'available': int,
+}
+CAR_REQUIRED = ('fleet_code', 'name', 'brand', 'model', 'year', 'car_type', 'seats',
+                'transmission', 'fuel_type', 'price_per_day', 'location_id')
+
+class InvalidRecord(Exception):
+    """A record that can't be imported."""
+
+def read_records(path):
+    """Yield dicts from a .csv, .json or .jsonl/.ndjson file."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if ext == '.csv':
+            yield from csv.DictReader(f)
+        elif ext in ('.jsonl', '.ndjson'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif ext == '.json':
+            yield from json.load(f)
+        else:
+            raise ValueError(f'Unsupported file type: {path}')
+
+def convert(record, columns, required):
+    """Coerce a record's known columns; empty optional values become NULL."""
+    row = {}
+    for column, cast in columns.items():
+        if column not in record:
+            continue
+        value = record[column]
+        if value is None or value == '':
+            if column in required:
+                raise InvalidRecord(f'{column} is required')
+            row[column] = None
+            continue
+        try:
+            row[column] = cast(value)
+        except (TypeError, ValueError):
+            raise InvalidRecord(f'{column} has invalid value {value!r}')
+    missing = [column for column in required if column not in row]
+    if missing:
+        raise InvalidRecord(f"missing {', '.join(missing)}")
+    return row
+
+def insert_sql(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+def update_sql(table, key, columns):
+    """UPDATE by natural key that leaves rows with no changed values alone."""
+    values = [column for column in columns if column not in key]
+    return f'''
+        UPDATE {table} SET {', '.join(f'{c} = ?' for c in values)}
+        WHERE {' AND '.join(f'{c} = ?' for c in key)}
+        AND ({' OR '.join(f'{c} IS NOT ?' for c in values)})
+    '''
+
+def existing_keys(conn, table, key):
+    return {tuple(row) for row in conn.execute(f"SELECT {', '.join(key)} FROM {table}")}
+
+def write_batches(table, key, rows, batch_size, counts):
+    """Insert new rows and update changed ones, one transaction per batch.
+
+    Existing keys are looked up first instead of using INSERT ... ON CONFLICT,
+    which would burn an AUTOINCREMENT id for every row that already exists.
+    """
+    rows = iter(rows)
+    conn = database.get_db_connection()
+    try:
+        known = existing_keys(conn, table, key)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            # Group by column set; a file's records normally share one
+            inserts, updates = {}, {}
+            for row in batch:
+                columns = tuple(row)
+                natural_key = tuple(row[column] for column in key)
+                if natural_key in known:
+                    values = [v for c, v in row.items() if c not in key]
+                    if values:
+                        updates.setdefault(columns, []).append(values + list(natural_key) + values)
+                else:
+                    known.add(natural_key)
+                    inserts.setdefault(columns, []).append(tuple(row.values()))
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for columns, params in inserts.items():
+                    counts['inserted'] += conn.executemany(insert_sql(table, columns), params).rowcount
+                for columns, params in updates.items():
+                    # rowcount excludes the table_versions trigger writes
+                    counts['updated'] += conn.executemany(update_sql(table, key, columns), params).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            counts['rows'] += len(batch)
+    finally:
+        conn.close()
+    counts['unchanged'] = counts['rows'] - counts['inserted'] - counts['updated']
+    return counts
+
+def new_counts():
+    return {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': []}
+
+def skip(counts, line, error):
+    counts['skipped'] += 1
+    if len(counts['errors']) < 20:
+        counts['errors'].append(f'record {line}: {error}')
+
+def import_locations(path, batch_size=IMPORT_BATCH_SIZE):
+    """Upsert locations by (city, name). Returns counts."""
+    counts = new_counts()
+
+    def rows():
+        seen = set()
+        for line, record in enumerate(read_records(path), 1):
+            try:
+                row = convert(record, LOCATION_COLUMNS, LOCATION_REQUIRED)
+            except InvalidRecord as e:
+                skip(counts, line, e)
+                continue
+            natural_key = tuple(row[column] for column in LOCATION_KEY)
+            if natural_key in seen:
+                skip(counts, line, f'duplicate location {natural_key}')
+                continue
+            seen.add(natural_key)
+            yield row
+
+    return write_batches('locations', LOCATION_KEY, rows(), batch_size, counts)
+
+def location_ids():
+    conn = database.get_db_connection()
+    ids = {(row['city'], row['name']): row['id']
+           for row in conn.execute('SELECT id, city, name FROM locations')}
+    conn.close()
+    return ids
+
+def import_cars(path, batch_size=IMPORT_BATCH_SIZE):
+    """Upsert cars by fleet_code, resolving location_city/location_name. Returns counts."""
+    counts = new_counts()
+    locations = location_ids()
+    known_ids = set(locations.values())
+
+    def rows():
+        seen = set()
+        for line, record in enumerate(read_records(path), 1):
+            try:
+                if not record.get('location_id'):
+                    place = (record.get('location_city'), record.get('location_name'))
+                    if place not in locations:
+                        raise InvalidRecord(f'unknown location {place}')
+                    record = dict(record, location_id=locations[place])
+                row = convert(record, CAR_COLUMNS, CAR_REQUIRED)
+                if row['location_id'] not in known_ids:
+                    raise InvalidRecord(f"unknown location_id {row['location_id']}")
+            except InvalidRecord as e:
+                skip(counts, line, e)
+                continue
+            if row['fleet_code'] in seen:
+                skip(counts, line, f"duplicate fleet_code {row['fleet_code']}")
+                continue
+            seen.add(row['fleet_code'])
+            yield row
+
+    return write_batches('cars', CAR_KEY, rows(), batch_size, counts)
+
+def report(label, counts, seconds):
+    print(f"{label}: {counts['rows']} rows in {seconds:.2f}s - "
+          f"{counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged, {counts['skipped']} skipped")
+    for error in counts['errors']:
+        print(f"  {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk upsert locations and cars.')
+    parser.add_argument('--locations', help='locations file (.csv, .json, .jsonl)')
+    parser.add_argument('--cars', help='cars file (.csv, .json, .jsonl)')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                        help='rows per transaction')
+    args = parser.parse_args()
+    if not args.locations and not args.cars:
+        args.locations = os.path.join(DATA_DIR, 'locations.csv')
+        args.cars = os.path.join(DATA_DIR, 'cars.csv')
+
+    database.migrate_db()
+    if args.locations:
+        start = time.perf_counter()
+        report('Locations', import_locations(args.locations, args.batch_size), time.perf_counter() - start)
+    if args.cars:
+        start = time.perf_counter()
+        counts = import_cars(args.cars, args.batch_size)
+        report('Cars', counts, time.perf_counter() - start)
+        if counts['inserted'] or counts['updated']:
+            print(f"Image srcsets: {image_variants.refresh_srcsets()} cars updated")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+"""
+End-to-end HTTP load test of the whole stack (wsgi.py -> app.py -> blueprints).
+
+Starts gunicorn on a free local port against a scratch copy of a generated
+dataset (see generate_dataset.py), then runs --users virtual users, each
+logging in once and looping through the booking scenario:
+
+    browse cars -> car details -> check availability -> book
+    -> list bookings -> cancel (when the booking succeeded)
+
+Another --admins virtual users log in as the seeded admin and stream the
+NDJSON bookings export every --export-interval seconds. Logins answered
+with 503 (password hasher busy) are retried until the run ends; users that
+never get in are reported as failed logins. Every request is timed per
+endpoint. The report shows throughput, p50/p95/p99 latency, 409
+rate and error rate (5xx and connection failures) for each endpoint.
+
+Everything runs locally using only the standard library on the client side.
+Pass --server uvicorn to run asgi.py on gunicorn's uvicorn workers instead of
+wsgi.py on its sync workers (--threads is then the ASGI thread pool size), or
+--url to drive a server that is already running.
+
+Usage: python load_test.py [--size small] [--users 20] [--duration 30]
+                           [--server gunicorn|uvicorn] [--workers 2] [--threads 4]
+                           [--output results.json]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from datetime import date, timedelta
+
+from bench_queries import dataset_path
+from bench_stats import percentile
+from generate_dataset import GENERATED_PASSWORD, SIZES
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+ADMIN_EMAIL = 'admin@carrental.com'
+ADMIN_PASSWORD = 'admin123'
+
+class Stats:
+    """Thread-safe per-endpoint latency samples and status counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.failed_logins = 0
+
+    def record(self, name, status, seconds):
+        with self._lock:
+            self.samples[name].append(seconds)
+            self.statuses[name][status] += 1
+
+    def login_failed(self):
+        with self._lock:
+            self.failed_logins += 1
+
+class Client:
+    """Keep-alive HTTP client that remembers the session cookie."""
+
+    def __init__(self, host, port, stats, timeout=30):
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.timeout = timeout
+        self.cookie = None
+        self.conn = None
+
+    def request(self, name, method, path, body=None):
+        """Send a request and record it under name. Returns (status, parsed body)."""
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        # The server drops idle keep-alive connections; like a browser,
+        # retry once on a fresh connection if a reused one was closed
+        for reused in (self.conn is not None, False):
+            start = time.perf_counter()
+            try:
+                if self.conn is None:
+                    self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.conn.close()
+                self.conn = None
+                if reused and isinstance(e, (ConnectionError, http.client.RemoteDisconnected)):
+                    continue
+                # Reset, timeout, server gone: counted as an error
+                self.stats.record(name, 'error', time.perf_counter() - start)
+                return None, None
+        status = response.status
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        self.stats.record(name, status, time.perf_counter() - start)
+        if response.getheader('Content-Type', '').startswith('application/json') and data:
+            return status, json.loads(data)
+        return status, data
+
+    def login(self, email, password, deadline):
+        """Log in, waiting out 503s from the bounded password hasher until deadline.
+
+        Returns the last status (None on a connection error).
+        """
+        while True:
+            status, _ = self.request('POST /api/login', 'POST', '/api/login',
+                                     {'email': email, 'password': password})
+            if status != 503 or time.time() + 0.5 >= deadline:
+                return status
+            time.sleep(0.5)
+
+def random_window(rng):
+    pickup = date.today() + timedelta(days=rng.randint(1, 60))
+    return pickup.isoformat(), (pickup + timedelta(days=rng.randint(1, 7))).isoformat()
+
+def booking_user(client, rng, number, deadline, think):
+    email = f'user{number}@example.com'
+    status = client.login(email, GENERATED_PASSWORD, deadline)
+    if status == 401:
+        # Not a generated database: register the user first
+        client.request('POST /api/register', 'POST', '/api/register', {
+            'email': email, 'password': GENERATED_PASSWORD,
+            'full_name': f'Load Test {number}', 'phone': '+1-555-0000'
+        })
+        status = client.login(email, GENERATED_PASSWORD, deadline)
+    if status != 200:
+        client.stats.login_failed()
+        return
+
+    while time.time() < deadline:
+        _, locations = client.request('GET /api/locations', 'GET', '/api/locations')
+        query = ''
+        if isinstance(locations, list) and locations:
+            query = f"?location_id={rng.choice(locations)['id']}"
+        _, cars = client.request('GET /api/cars', 'GET', '/api/cars' + query)
+        if not isinstance(cars, list) or not cars:
+            time.sleep(think)
+            continue
+        # Most renters pick one of the first (cheapest) cars, so bookings collide
+        car = cars[min(len(cars) - 1, int(rng.expovariate(1 / 3)))]
+        client.request('GET /api/cars/<id>', 'GET', f"/api/cars/{car['id']}")
+
+        pickup_date, return_date = random_window(rng)
+        client.request('POST /api/cars/check-availability', 'POST', '/api/cars/check-availability',
+                       {'car_id': car['id'], 'pickup_date': pickup_date, 'return_date': return_date})
+        nights = (date.fromisoformat(return_date) - date.fromisoformat(pickup_date)).days
+        status, created = client.request('POST /api/bookings', 'POST', '/api/bookings', {
+            'car_id': car['id'], 'pickup_date': pickup_date, 'return_date': return_date,
+            'pickup_location_id': car['location_id'], 'return_location_id': car['location_id'],
+            'total_price': round(car['price_per_day'] * nights, 2)
+        })
+        client.request('GET /api/bookings', 'GET', '/api/bookings?limit=20')
+        if status == 201:
+            client.request('DELETE /api/bookings/<id>', 'DELETE', f"/api/bookings/{created['booking_id']}")
+        time.sleep(think)
+
+def admin_user(client, rng, deadline, interval):
+    if client.login(ADMIN_EMAIL, ADMIN_PASSWORD, deadline) != 200:
+        client.stats.login_failed()
+        return
+    while time.time() < deadline:
+        start = date.today() - timedelta(days=rng.randint(0, 365))
+        query = urllib.parse.urlencode({
+            'format': 'ndjson', 'from': start.isoformat(),
+            'to': (start + timedelta(days=90)).isoformat()
+        })
+        client.request('GET /api/admin/bookings/export', 'GET', f'/api/admin/bookings/export?{query}')
+        time.sleep(interval)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(database_path, port, workers, threads, server_name='gunicorn'):
+    env = dict(os.environ, DATABASE_PATH=database_path,
+               SECRET_KEY='load-test', FLASK_ENV='production')
+    if server_name == 'uvicorn':
+        env['ASGI_THREADS'] = str(threads)
+        # Not uvicorn --workers: its workers' sockets miss TCP_NODELAY (see asgi.py)
+        command = [
+            sys.executable, '-m', 'gunicorn', '--chdir', ROOT_DIR,
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+            '--worker-class', 'uvicorn.workers.UvicornWorker', '--log-level', 'warning', 'asgi:app',
+        ]
+    else:
+        command = [
+            sys.executable, '-m', 'gunicorn', '--chdir', ROOT_DIR,
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+            '--threads', str(threads), '--log-level', 'warning', 'wsgi:app',
+        ]
+    server = subprocess.Popen(command, env=env)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'{server_name} exited with status {server.returncode}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/locations')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'{server_name} did not start within 60s')
+
+def summarize(stats, elapsed):
+    """Per-endpoint summary rows, sorted by endpoint name."""
+    summary = {}
+    for name in sorted(stats.samples):
+        samples = stats.samples[name]
+        statuses = stats.statuses[name]
+        count = len(samples)
+        errors = statuses.get('error', 0) + sum(
+            n for status, n in statuses.items() if status != 'error' and status >= 500
+        )
+        summary[name] = {
+            'requests': count,
+            'rps': round(count / elapsed, 1),
+            'p50_ms': round(percentile(samples, 50) * 1000, 1),
+            'p95_ms': round(percentile(samples, 95) * 1000, 1),
+            'p99_ms': round(percentile(samples, 99) * 1000, 1),
+            'conflict_rate': round(statuses.get(409, 0) / count, 4),
+            'error_rate': round(errors / count, 4),
+            'statuses': {str(status): n for status, n in sorted(statuses.items(), key=str)},
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP load test of the car rental API.')
+    parser.add_argument('--size', choices=SIZES, default='small', help='generated dataset to use')
+    parser.add_argument('--database', help='database file to copy instead of a generated one')
+    parser.add_argument('--url', help='drive an already running server (e.g. http://127.0.0.1:5000)')
+    parser.add_argument('--users', type=int, default=20, help='concurrent booking users')
+    parser.add_argument('--admins', type=int, default=1, help='concurrent admin export users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--think', type=float, default=0, help='seconds each user pauses per loop')
+    parser.add_argument('--export-interval', type=float, default=5)
+    parser.add_argument('--server', choices=('gunicorn', 'uvicorn'), default='gunicorn',
+                        help='serve wsgi.py on sync workers or asgi.py on uvicorn workers')
+    parser.add_argument('--workers', type=int, default=2, help='server worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='request threads per worker')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    server = None
+    scratch_dir = None
+    if args.url:
+        parsed = urllib.parse.urlsplit(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        source = args.database or dataset_path(args.size)
+        scratch_dir = tempfile.mkdtemp()
+        database_path = os.path.join(scratch_dir, 'load.db')
+        shutil.copyfile(source, database_path)
+        host, port = '127.0.0.1', free_port()
+        print(f"Starting {args.server}: {args.workers} workers x {args.threads} threads on port {port}")
+        server = start_server(database_path, port, args.workers, args.threads, args.server)
+
+    stats = Stats()
+    rng = random.Random(args.seed)
+    deadline = time.time() + args.duration
+    threads = [
+        threading.Thread(target=booking_user, args=(
+            Client(host, port, stats), random.Random(rng.random()), i + 1, deadline, args.think))
+        for i in range(args.users)
+    ]
+    threads += [
+        threading.Thread(target=admin_user, args=(
+            Client(host, port, stats), random.Random(rng.random()), deadline, args.export_interval))
+        for _ in range(args.admins)
+    ]
+    print(f"Running {args.users} users and {args.admins} admins for {args.duration:.0f}s...")
+    started = time.time()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        elapsed = time.time() - started
+        if server:
+            server.terminate()
+            server.wait()
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    summary = summarize(stats, elapsed)
+    total = sum(row['requests'] for row in summary.values())
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+          f"{stats.failed_logins} of {len(threads)} users failed to log in\n")
+    print(f"{'endpoint':<36} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'409':>7} {'errors':>7}")
+    for name, row in summary.items():
+        print(f"{name:<36} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['conflict_rate']:>7.1%} {row['error_rate']:>7.1%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'config': {key: value for key, value in vars(args).items() if key != 'output'},
+                'elapsed': round(elapsed, 2),
+                'requests': total,
+                'rps': round(total / elapsed, 1),
+                'failed_logins': stats.failed_logins,
+                'endpoints': summary,
+            }, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+Request instrumentation and a Prometheus /metrics endpoint.
+
+init_metrics(app) times every request and attributes to it the time spent
+in SQL (through database.QUERY_LISTENERS), password hashing
+(passwords.HASH_LISTENERS) and JSON encoding. Responses to admin sessions
+(or to everyone with SERVER_TIMING=1) get a Server-Timing header with that
+breakdown; it isn't sent to the public since e.g. the bcrypt time of a
+login says whether the account exists. Per-endpoint totals are kept for
+/metrics together with pool and cache stats.
+
+Each gunicorn worker writes its totals to METRICS_DIR/<master pid>-<pid>.json
+at most every METRICS_FLUSH_INTERVAL seconds, and /metrics sums the files of
+every worker under the same master, so whichever worker answers a scrape
+reports the whole server. A worker's file is removed when it exits, and
+files of workers that are no longer running are skipped and removed, so a
+restarted worker's totals drop out (Prometheus treats that as a counter
+reset).
+
+With METRICS_TOKEN set, /metrics requires "Authorization: Bearer <token>";
+without it, /metrics only answers requests from the local machine.
+"""
+
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import Blueprint, Response, g, has_request_context, request, session
+from flask.json.provider import DefaultJSONProvider
+
+import database
+import passwords
+from catalog_cache import catalog_cache
+from user_cache import profile_cache
+
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'car-rental-metrics')
+)
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Send Server-Timing to every client, not just admin sessions
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+
+# Peers allowed to scrape /metrics when METRICS_TOKEN is unset
+LOOPBACK_ADDRS = ('127.0.0.1', '::1')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Per-request time segments: (g attribute, Server-Timing name, metric name)
+SEGMENTS = (
+    ('sql_seconds', 'sql', 'app_sql_seconds_total'),
+    ('hash_seconds', 'hash', 'app_password_hash_seconds_total'),
+    ('json_seconds', 'json', 'app_json_seconds_total'),
+)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+class Registry:
+    """This process's request totals; updated from request threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}   # (endpoint, method, status) -> count
+        self.endpoints = {}  # endpoint -> histogram and per-segment totals
+        self.flushed_at = 0.0
+
+    def observe(self, endpoint, method, status, seconds, queries, segments):
+        with self._lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = dict(
+                    buckets=[0] * len(LATENCY_BUCKETS), sum=0.0, count=0, sql_queries=0,
+                    **{attribute: 0.0 for attribute, _, _ in SEGMENTS}
+                )
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats['buckets'][i] += 1
+            stats['sum'] += seconds
+            stats['count'] += 1
+            stats['sql_queries'] += queries
+            for attribute, value in segments.items():
+                stats[attribute] += value
+
+    def snapshot(self):
+        """JSON-serialisable totals, plus this process's pool and cache stats."""
+        with self._lock:
+            requests = [[*key, count] for key, count in self.requests.items()]
+            endpoints = {name: dict(stats, buckets=list(stats['buckets']))
+                         for name, stats in self.endpoints.items()}
+        pool = database.get_pool().stats()
+        gauges = [
+            ['app_db_pool_idle_connections', {}, pool['idle']],
+            ['app_db_pool_connections_created_total', {}, pool['created']],
+            ['app_password_hash_rejected_total', {}, passwords.password_hasher.rejected],
+        ]
+        for name, cache in (('catalog', catalog_cache), ('user_profile', profile_cache)):
+            stats = cache.stats()
+            gauges += [
+                ['app_cache_entries', {'cache': name}, stats['size']],
+                ['app_cache_hits_total', {'cache': name}, stats['hits']],
+                ['app_cache_misses_total', {'cache': name}, stats['misses']],
+                ['app_cache_invalidations_total', {'cache': name}, stats['invalidations']],
+            ]
+        return {'requests': requests, 'endpoints': endpoints, 'gauges': gauges}
+
+    def path(self):
+        return os.path.join(METRICS_DIR, f'{os.getppid()}-{os.getpid()}.json')
+
+    def flush(self):
+        """Write this worker's snapshot for the other workers to read."""
+        self.flushed_at = time.time()
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = self.path()
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def remove(self):
+        """Delete this worker's snapshot, e.g. when it exits."""
+        try:
+            os.remove(self.path())
+        except OSError:
+            pass
+
+registry = Registry()
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def collect():
+    """Merge the snapshots of every live worker started by our master process."""
+    registry.flush()
+    master = os.getppid()
+    requests, endpoints, gauges = {}, {}, {}
+    workers = 0
+    for path in glob.glob(os.path.join(METRICS_DIR, '*-*.json')):
+        owner, pid = (int(part) for part in os.path.basename(path)[:-len('.json')].split('-'))
+        alive = _pid_alive(pid)
+        if owner != master or not alive:
+            if not alive:
+                # Left behind by a worker that died, in this or an earlier server run
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            continue
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        workers += 1
+        for endpoint, method, status, count in snapshot['requests']:
+            key = (endpoint, method, status)
+            requests[key] = requests.get(key, 0) + count
+        for endpoint, stats in snapshot['endpoints'].items():
+            total = endpoints.setdefault(endpoint, {
+                key: [0] * len(LATENCY_BUCKETS) if key == 'buckets' else 0 for key in stats
+            })
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], stats['buckets'])]
+            for key, value in stats.items():
+                if key != 'buckets':
+                    total[key] += value
+        for name, labels, value in snapshot['gauges']:
+            key = (name, tuple(sorted(labels.items())))
+            gauges[key] = gauges.get(key, 0) + value
+    return workers, requests, endpoints, gauges
+
+def _labels(**labels):
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+def render(workers, requests, endpoints, gauges):
+    """Prometheus text exposition format."""
+    lines = [
+        '# HELP app_workers Worker processes reporting metrics.',
+        '# TYPE app_workers gauge',
+        f'app_workers {workers}',
+        '# HELP http_requests_total Requests by endpoint, method and status.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (endpoint, method, status), count in sorted(requests.items()):
+        lines.append(f'http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+    lines += ['# HELP http_request_duration_seconds Time spent in the Flask app per request.',
+              '# TYPE http_request_duration_seconds histogram']
+    for endpoint, stats in sorted(endpoints.items()):
+        for bound, count in zip(LATENCY_BUCKETS, stats['buckets']):
+            lines.append(f'http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=bound)} {count}')
+        lines.append(f'http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le="+Inf")} {stats["count"]}')
+        lines.append(f'http_request_duration_seconds_sum{_labels(endpoint=endpoint)} {stats["sum"]:.6f}')
+        lines.append(f'http_request_duration_seconds_count{_labels(endpoint=endpoint)} {stats["count"]}')
+
+    totals = [('sql_queries', 'app_sql_queries_total', 'SQL statements run by requests.')]
+    totals += [(attribute, metric, f'Seconds requests spent in {name}.') for attribute, name, metric in SEGMENTS]
+    for attribute, metric, help_text in totals:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        for endpoint, stats in sorted(endpoints.items()):
+            lines.append(f'{metric}{_labels(endpoint=endpoint)} {stats[attribute]:.6g}')
+
+    seen = set()
+    for (name, labels), value in sorted(gauges.items()):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f'# TYPE {name} {"counter" if name.endswith("_total") else "gauge"}')
+        lines.append(f'{name}{_labels(**dict(labels)) if labels else ""} {value}')
+    return '\n'.join(lines) + '\n'
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for all workers of this server."""
+    if METRICS_TOKEN:
+        if request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+            return Response('Unauthorized\n', 401, mimetype='text/plain')
+    elif request.remote_addr not in LOOPBACK_ADDRS:
+        return Response('Forbidden: set METRICS_TOKEN to scrape remotely\n', 403, mimetype='text/plain')
+    return Response(render(*collect()), mimetype='text/plain; version=0.0.4')
+
+def _on_query(sql, seconds, executions):
+    if has_request_context() and 'metrics_start' in g:
+        g.sql_queries += executions
+        g.sql_seconds += seconds
+
+def _on_hash(seconds):
+    if has_request_context() and 'metrics_start' in g:
+        g.hash_seconds += seconds
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, timing serialisation for the current request."""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            if has_request_context() and 'metrics_start' in g:
+                g.json_seconds += time.perf_counter() - start
+
+def init_metrics(app):
+    """Instrument app's requests and register /metrics."""
+    app.json = TimedJSONProvider(app)
+    app.register_blueprint(metrics_bp)
+    if _on_query not in database.QUERY_LISTENERS:
+        database.QUERY_LISTENERS.append(_on_query)
+    if _on_hash not in passwords.HASH_LISTENERS:
+        passwords.HASH_LISTENERS.append(_on_hash)
+
+    @app.before_request
+    def start_timer():
+        g.sql_queries = 0
+        for attribute, _, _ in SEGMENTS:
+            setattr(g, attribute, 0.0)
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        if 'metrics_start' not in g:
+            return response
+        seconds = time.perf_counter() - g.metrics_start
+        segments = {attribute: getattr(g, attribute) for attribute, _, _ in SEGMENTS}
+        # Only touch the session when there is one: reading it adds Vary: Cookie
+        has_session = app.config['SESSION_COOKIE_NAME'] in request.cookies
+        if SERVER_TIMING or (has_session and session.get('is_admin')):
+            timing = [f'{name};dur={segments[attribute] * 1000:.2f}' for attribute, name, _ in SEGMENTS]
+            timing[0] += f';desc="{g.sql_queries} queries"'
+            timing.append(f'app;dur={seconds * 1000:.2f}')
+            response.headers['Server-Timing'] = ', '.join(timing)
+
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        registry.observe(endpoint, request.method, str(response.status_code),
+                         seconds, g.sql_queries, segments)
+        if time.time() - registry.flushed_at >= METRICS_FLUSH_INTERVAL:
+            registry.flush()
+        return response
+
+    atexit.register(registry.remove)
@@ -0,0 +1,27 @@
+-- Indexes for the hot queries in database.py
+
+-- check_car_availability: overlap lookup per car
+CREATE INDEX IF NOT EXISTS idx_bookings_car_status_dates
+    ON bookings (car_id, status, pickup_date, return_date);
+
+-- get_user_bookings: per-user list, newest first
+CREATE INDEX IF NOT EXISTS idx_bookings_user_created
+    ON bookings (user_id, created_at);
+
+-- get_all_bookings: admin list, newest first
+CREATE INDEX IF NOT EXISTS idx_bookings_created
+    ON bookings (created_at);
+
+-- get_all_cars: filter by location or type, ordered by price
+CREATE INDEX IF NOT EXISTS idx_cars_available_location_price
+    ON cars (available, location_id, price_per_day);
+
+CREATE INDEX IF NOT EXISTS idx_cars_available_type_price
+    ON cars (available, car_type, price_per_day);
+
+CREATE INDEX IF NOT EXISTS idx_cars_available_price
+    ON cars (available, price_per_day);
+
+-- get_all_locations: ordered by city
+CREATE INDEX IF NOT EXISTS idx_locations_city
+    ON locations (city);
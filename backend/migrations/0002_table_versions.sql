@@ -0,0 +1,70 @@
+-- Per-table change counters, bumped by triggers on every write.
+-- Workers compare them to detect changes made by other processes.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO table_versions (name) VALUES
+    ('users'), ('locations'), ('cars'), ('bookings');
+
+CREATE TRIGGER IF NOT EXISTS users_version_insert AFTER INSERT ON users
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_version_update AFTER UPDATE ON users
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_version_delete AFTER DELETE ON users
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_version_insert AFTER INSERT ON locations
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'locations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_version_update AFTER UPDATE ON locations
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'locations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_version_delete AFTER DELETE ON locations
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'locations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_version_insert AFTER INSERT ON cars
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'cars';
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_version_update AFTER UPDATE ON cars
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'cars';
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_version_delete AFTER DELETE ON cars
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'cars';
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_version_insert AFTER INSERT ON bookings
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'bookings';
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_version_update AFTER UPDATE ON bookings
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'bookings';
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_version_delete AFTER DELETE ON bookings
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'bookings';
+END;
@@ -0,0 +1,3 @@
+-- iter_bookings_for_export: date-range export ordered by pickup date
+CREATE INDEX IF NOT EXISTS idx_bookings_pickup
+    ON bookings (pickup_date);
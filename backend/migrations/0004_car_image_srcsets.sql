@@ -0,0 +1,3 @@
+-- Responsive image variants written by image_variants.py
+ALTER TABLE cars ADD COLUMN image_srcset TEXT;
+ALTER TABLE cars ADD COLUMN image_webp_srcset TEXT;
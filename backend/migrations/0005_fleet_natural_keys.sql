@@ -0,0 +1,12 @@
+-- Natural keys used by import_fleet.py to upsert instead of duplicating.
+-- Locations are identified by (city, name), cars by their fleet code.
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_locations_city_name
+    ON locations (city, name);
+
+ALTER TABLE cars ADD COLUMN fleet_code TEXT;
+
+UPDATE cars SET fleet_code = printf('CAR-%05d', id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cars_fleet_code
+    ON cars (fleet_code);
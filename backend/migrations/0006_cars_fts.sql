@@ -0,0 +1,43 @@
+-- Full-text index over the searchable car columns, for /api/cars?q=.
+-- External content: the text lives in cars, the triggers below keep the
+-- index in sync with every insert, update and delete (add_car, update_car,
+-- update_cars, import_fleet.py, ...). rebuild_search_index.py rebuilds it.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS cars_fts USING fts5(
+    name, brand, model, car_type, fuel_type, transmission, description, features,
+    content = 'cars',
+    content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+-- BM25 column weights: matches in the name count most, the description least
+INSERT INTO cars_fts (cars_fts, rank) VALUES ('rank', 'bm25(10.0, 6.0, 6.0, 3.0, 3.0, 2.0, 1.0, 2.0)');
+
+CREATE TRIGGER IF NOT EXISTS cars_fts_insert AFTER INSERT ON cars
+BEGIN
+    INSERT INTO cars_fts (rowid, name, brand, model, car_type, fuel_type, transmission, description, features)
+    VALUES (new.id, new.name, new.brand, new.model, new.car_type, new.fuel_type, new.transmission,
+            new.description, new.features);
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_fts_delete AFTER DELETE ON cars
+BEGIN
+    INSERT INTO cars_fts (cars_fts, rowid, name, brand, model, car_type, fuel_type, transmission, description, features)
+    VALUES ('delete', old.id, old.name, old.brand, old.model, old.car_type, old.fuel_type, old.transmission,
+            old.description, old.features);
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_fts_update
+AFTER UPDATE OF name, brand, model, car_type, fuel_type, transmission, description, features ON cars
+BEGIN
+    INSERT INTO cars_fts (cars_fts, rowid, name, brand, model, car_type, fuel_type, transmission, description, features)
+    VALUES ('delete', old.id, old.name, old.brand, old.model, old.car_type, old.fuel_type, old.transmission,
+            old.description, old.features);
+    INSERT INTO cars_fts (rowid, name, brand, model, car_type, fuel_type, transmission, description, features)
+    VALUES (new.id, new.name, new.brand, new.model, new.car_type, new.fuel_type, new.transmission,
+            new.description, new.features);
+END;
+
+-- Index the cars that already exist
+INSERT INTO cars_fts (cars_fts) VALUES ('rebuild');
@@ -0,0 +1,90 @@
+"""
+Password hashing on a bounded executor.
+
+bcrypt is deliberately slow, so hashing runs on at most
+PASSWORD_HASH_WORKERS threads per process and at most PASSWORD_HASH_QUEUE
+more requests may wait for one. Anything beyond that raises
+PasswordHasherBusy, which the auth routes turn into a 503, instead of
+letting a login burst starve the rest of the API.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+# Callbacks run after each hash/verify as listener(seconds), where seconds
+# includes time spent queued for a worker
+HASH_LISTENERS = []
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are running or queued; retry later."""
+
+class PasswordHasher:
+    """Runs bcrypt on a small thread pool with a bounded backlog."""
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_depth=PASSWORD_HASH_QUEUE,
+                 rounds=BCRYPT_ROUNDS, timeout=PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Threads don't survive fork, so each gunicorn worker gets its own pool
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='bcrypt'
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy('Too many concurrent password operations')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        start = time.perf_counter()
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy('Timed out waiting for a password worker')
+        finally:
+            for listener in HASH_LISTENERS:
+                listener(time.perf_counter() - start)
+
+    def hash(self, password):
+        """Hash a password with the configured cost."""
+        salt = bcrypt.gensalt(self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password, password_hash):
+        """Check a password against a stored hash."""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """True if the stored hash was made with a different cost."""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+password_hasher = PasswordHasher()
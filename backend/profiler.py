@@ -0,0 +1,201 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled when an admin sends an "X-Profile" header or a
+"profile" query arg, or at random for PROFILE_SAMPLE_RATE of all /api/
+requests. The flag's value picks the profiler:
+
+- cprofile (the default, or any other value): deterministic cProfile of
+  the request thread, saved as a .pstats file for pstats/snakeviz
+- sample: a thread records the request thread's stack every
+  PROFILE_INTERVAL seconds, saved as collapsed stacks for flamegraph.pl or
+  speedscope
+
+Profiles go to PROFILE_DIR as <id>.pstats or <id>.collapsed, next to an
+<id>.json description. Only the PROFILE_MAX_PROFILES most recently written
+or downloaded profiles are kept. The response carries the profile id in an
+X-Profile-Id header, and /api/admin/profiles lists and serves profiles.
+
+Only one request per worker is profiled at a time; other flagged requests
+run unprofiled. Work on other threads (bcrypt runs on the password hasher's
+pool) shows up as time spent waiting, and so does the body of a streamed
+response, which runs after profiling has stopped.
+"""
+
+import cProfile
+import glob
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+from auth import current_user_profile
+
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'car-rental-profiles')
+)
+PROFILE_MAX_PROFILES = int(os.environ.get('PROFILE_MAX_PROFILES', 100))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SAMPLER = os.environ.get('PROFILE_SAMPLER', 'cprofile')
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.001))
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ARG = 'profile'
+PROFILE_ID = re.compile(r'^[\w-]+$')
+# Profile file extension for each profiler
+PROFILE_FORMATS = {'cprofile': 'pstats', 'sample': 'collapsed'}
+
+# cProfile can only profile one thread at a time on Python 3.12+
+_active = threading.Lock()
+_counter = itertools.count(1)
+
+class StackSampler:
+    """Samples one thread's Python stack into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+def profile_path(profile_id, ext):
+    return os.path.join(PROFILE_DIR, f'{profile_id}.{ext}')
+
+def list_profiles():
+    """Descriptions of the stored profiles, most recently used first."""
+    profiles = []
+    for path in glob.glob(os.path.join(PROFILE_DIR, '*.json')):
+        try:
+            with open(path) as f:
+                profile = json.load(f)
+            profile['used_at'] = os.path.getmtime(path)
+        except (OSError, ValueError):
+            continue
+        profiles.append(profile)
+    profiles.sort(key=lambda profile: profile['used_at'], reverse=True)
+    return profiles
+
+def get_profile(profile_id):
+    """(description, path of the profile data), or None. Marks it as used."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(profile_path(profile_id, 'json')) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = profile_path(profile_id, PROFILE_FORMATS[profile['profiler']])
+    if not os.path.exists(path):
+        return None
+    os.utime(profile_path(profile_id, 'json'))
+    return profile, path
+
+def prune(keep=PROFILE_MAX_PROFILES):
+    """Delete the least recently used profiles beyond keep."""
+    for profile in list_profiles()[keep:]:
+        for ext in ('json', *PROFILE_FORMATS.values()):
+            try:
+                os.remove(profile_path(profile['id'], ext))
+            except FileNotFoundError:
+                pass
+
+def requested_profiler():
+    """The profiler this request asks for, or None."""
+    flag = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_ARG)
+    if flag:
+        user = current_user_profile()
+        if user and user['is_admin']:
+            return flag if flag in PROFILE_FORMATS else 'cprofile'
+    if PROFILE_SAMPLE_RATE and request.path.startswith('/api/') and random.random() < PROFILE_SAMPLE_RATE:
+        return PROFILE_SAMPLER
+    return None
+
+def start_profile():
+    profiler = requested_profiler()
+    if profiler is None or not _active.acquire(blocking=False):
+        return
+    if profiler == 'sample':
+        g.profiler = StackSampler(threading.get_ident())
+        g.profiler.start()
+    else:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    g.profile_kind = profiler
+    g.profile_start = time.perf_counter()
+
+def stop_profile(status=None):
+    """Stop and save this request's profile; returns its id."""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return None
+    try:
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+        seconds = time.perf_counter() - g.profile_start
+        kind = g.profile_kind
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_counter)}"
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if kind == 'cprofile':
+            profiler.dump_stats(profile_path(profile_id, 'pstats'))
+        else:
+            profiler.dump(profile_path(profile_id, 'collapsed'))
+        with open(profile_path(profile_id, 'json'), 'w') as f:
+            json.dump({
+                'id': profile_id, 'profiler': kind, 'method': request.method,
+                'path': request.full_path.rstrip('?'), 'status': status,
+                'ms': round(seconds * 1000, 2), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }, f)
+    finally:
+        _active.release()
+    prune()
+    return profile_id
+
+def init_profiling(app):
+    """Profile flagged and sampled requests of app."""
+    app.before_request(start_profile)
+
+    @app.after_request
+    def save_profile(response):
+        profile_id = stop_profile(response.status_code)
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def save_failed_profile(exc):
+        # after_request doesn't run when the view raised
+        stop_profile()
@@ -0,0 +1,62 @@
+"""
+Rebuild the full-text car search index (cars_fts).
+
+Triggers keep cars_fts in sync with cars, so this is only needed when the
+index could be stale: cars written with the triggers dropped, a database
+restored from an old copy, or after changing the FTS columns. Applies
+pending migrations first (which creates and fills the index on databases
+that predate it), rebuilds the index from cars, merges its segments and
+runs FTS5's integrity check.
+
+Usage: python rebuild_search_index.py [--check-only]
+"""
+
+import argparse
+import sys
+import time
+
+import database
+
+def rebuild():
+    conn = database.get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("INSERT INTO cars_fts (cars_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO cars_fts (cars_fts) VALUES ('optimize')")
+        conn.commit()
+    finally:
+        conn.close()
+
+def check():
+    """True if the index matches the cars table."""
+    conn = database.get_db_connection()
+    try:
+        conn.execute("INSERT INTO cars_fts (cars_fts, rank) VALUES ('integrity-check', 1)")
+        return True
+    except database.sqlite3.DatabaseError as e:
+        print(f"Integrity check failed: {e}")
+        return False
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the cars_fts full-text index.')
+    parser.add_argument('--check-only', action='store_true',
+                        help='only check the index against the cars table')
+    args = parser.parse_args()
+
+    database.migrate_db()
+    if not args.check_only:
+        start = time.perf_counter()
+        rebuild()
+        conn = database.get_db_connection()
+        cars = conn.execute('SELECT COUNT(*) FROM cars').fetchone()[0]
+        conn.close()
+        print(f"Indexed {cars} cars in {time.perf_counter() - start:.2f}s")
+
+    if not check():
+        sys.exit(1)
+    print("Search index ok")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+-- DriveNow Car Rental database schema and sample data
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    phone TEXT,
+    is_admin INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS locations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    city TEXT NOT NULL,
+    state TEXT,
+    country TEXT NOT NULL,
+    address TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS cars (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    car_type TEXT NOT NULL,
+    seats INTEGER NOT NULL,
+    transmission TEXT NOT NULL,
+    fuel_type TEXT NOT NULL,
+    price_per_day REAL NOT NULL,
+    location_id INTEGER NOT NULL,
+    image_url TEXT,
+    description TEXT,
+    features TEXT,
+    available INTEGER DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (location_id) REFERENCES locations(id)
+);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    car_id INTEGER NOT NULL,
+    pickup_date DATE NOT NULL,
+    return_date DATE NOT NULL,
+    pickup_location_id INTEGER NOT NULL,
+    return_location_id INTEGER NOT NULL,
+    total_price REAL NOT NULL,
+    status TEXT DEFAULT 'confirmed',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (car_id) REFERENCES cars(id),
+    FOREIGN KEY (pickup_location_id) REFERENCES locations(id),
+    FOREIGN KEY (return_location_id) REFERENCES locations(id)
+);
+
+-- Sample data
+INSERT OR IGNORE INTO users (id, email, password_hash, full_name, phone, is_admin) VALUES
+    (1, 'admin@carrental.com', '$2b$12$YeT4PZvZBpoEZxaHRP9j1eY/R6Eb3o1Hj5x287VMudXq1NS5QsVMG', 'Admin User', '+1-555-0100', 1);
+
+INSERT OR IGNORE INTO locations (id, name, city, state, country, address) VALUES
+    (1, 'Downtown Hub', 'New York', 'NY', 'USA', '123 Broadway, New York, NY 10001'),
+    (2, 'Airport Center', 'Los Angeles', 'CA', 'USA', '1 World Way, Los Angeles, CA 90045'),
+    (3, 'Beach Station', 'Miami', 'FL', 'USA', '456 Ocean Drive, Miami, FL 33139'),
+    (4, 'City Center', 'Chicago', 'IL', 'USA', '789 Michigan Ave, Chicago, IL 60611'),
+    (5, 'Tech District', 'San Francisco', 'CA', 'USA', '321 Market St, San Francisco, CA 94102'),
+    (6, 'Historic Quarter', 'Boston', 'MA', 'USA', '555 Beacon St, Boston, MA 02215');
+
+INSERT OR IGNORE INTO cars (id, name, brand, model, year, car_type, seats, transmission,
+                          fuel_type, price_per_day, location_id, image_url, description, features) VALUES
+    (1, 'Tesla Model 3 Performance', 'Tesla', 'Model 3', 2024, 'Electric Sedan', 5, 'Automatic', 'Electric', 120.0, 1, '/images/cars/tesla_model_3_1769942219589.png', 'Experience the future of driving with this high-performance electric sedan.', 'Autopilot, Premium Sound, Glass Roof, Supercharging'),
+    (2, 'BMW X5 M Sport', 'BMW', 'X5', 2024, 'Luxury SUV', 7, 'Automatic', 'Hybrid', 150.0, 1, '/images/cars/bmw_x5_1769942238426.png', 'Luxury meets performance in this premium SUV.', 'Leather Seats, Panoramic Roof, Navigation, Premium Audio'),
+    (3, 'Mercedes-Benz C-Class', 'Mercedes-Benz', 'C-Class', 2024, 'Luxury Sedan', 5, 'Automatic', 'Petrol', 110.0, 2, '/images/cars/mercedes_c_class_1769942256490.png', 'Elegant and sophisticated luxury sedan for business or pleasure.', 'Leather Interior, Sunroof, Advanced Safety, Premium Sound'),
+    (4, 'Jeep Wrangler Unlimited', 'Jeep', 'Wrangler', 2024, 'SUV', 5, 'Automatic', 'Petrol', 95.0, 3, '/images/cars/jeep_wrangler_1769942275065.png', 'Adventure-ready SUV perfect for beach trips and off-road exploration.', 'Removable Top, 4WD, All-Terrain Tires, Bluetooth'),
+    (5, 'Porsche 911 Carrera', 'Porsche', '911', 2024, 'Sports Car', 4, 'Automatic', 'Petrol', 250.0, 2, '/images/cars/porsche_911_1769942293189.png', 'Iconic sports car delivering unmatched performance and style.', 'Sport Exhaust, Carbon Fiber, Premium Leather, Track Mode'),
+    (6, 'Toyota Camry Hybrid', 'Toyota', 'Camry', 2024, 'Sedan', 5, 'Automatic', 'Hybrid', 75.0, 4, '/images/cars/toyota_camry_1769942308962.png', 'Reliable and efficient hybrid sedan perfect for city driving.', 'Fuel Efficient, Apple CarPlay, Safety Sense, Comfortable'),
+    (7, 'Range Rover Sport', 'Land Rover', 'Range Rover Sport', 2024, 'Luxury SUV', 7, 'Automatic', 'Hybrid', 180.0, 5, '/images/cars/range_rover_1769942357466.png', 'Ultimate luxury SUV with off-road capability.', 'Terrain Response, Meridian Audio, Massage Seats, Air Suspension'),
+    (8, 'Audi A4 Quattro', 'Audi', 'A4', 2024, 'Sedan', 5, 'Automatic', 'Petrol', 100.0, 6, '/images/cars/audi_a4_1769942377766.png', 'Sophisticated sedan with all-wheel drive performance.', 'Quattro AWD, Virtual Cockpit, Bang & Olufsen, Matrix LED'),
+    (9, 'Ford Mustang GT', 'Ford', 'Mustang', 2024, 'Sports Car', 4, 'Manual', 'Petrol', 130.0, 3, '/images/cars/ford_mustang_1769942395914.png', 'American muscle car with thrilling performance.', 'V8 Engine, Performance Package, Premium Sound, Sport Mode'),
+    (10, 'Honda CR-V Hybrid', 'Honda', 'CR-V', 2024, 'SUV', 5, 'Automatic', 'Hybrid', 85.0, 1, '/images/cars/honda_crv_1769942411079.png', 'Spacious and efficient family SUV.', 'Honda Sensing, Hands-Free Liftgate, Wireless Charging, Sunroof'),
+    (11, 'Chevrolet Corvette', 'Chevrolet', 'Corvette', 2024, 'Sports Car', 2, 'Automatic', 'Petrol', 220.0, 2, '/images/cars/chevrolet_corvette_1769942427514.png', 'Mid-engine supercar with breathtaking performance.', 'Performance Exhaust, Carbon Fiber, Track Telemetry, Magnetic Ride'),
+    (12, 'Volkswagen Atlas', 'Volkswagen', 'Atlas', 2024, 'SUV', 7, 'Automatic', 'Petrol', 90.0, 4, '/images/cars/volkswagen_atlas_1769942444489.png', 'Family-friendly SUV with three rows of seating.', '3rd Row Seating, Digital Cockpit, Adaptive Cruise, Panoramic Sunroof');
@@ -0,0 +1,246 @@
+"""
+Opt-in slow-query log for the pooled connections from get_db_connection().
+
+Set SLOW_QUERY_MS to turn it on. Every statement run through a pooled
+connection is then timed (execute plus fetching its rows, through
+database.QUERY_LISTENERS) and grouped by fingerprint: the SQL with literals
+replaced by ? and whitespace collapsed, so the shapes produced by the
+dynamic SQL in get_all_cars() or update_car() are told apart while calls
+with different values are not. Statements slower than SLOW_QUERY_MS are
+written to a rotating log at SLOW_QUERY_LOG, and the first slow statement
+of each fingerprint also gets its EXPLAIN QUERY PLAN captured, logged and
+flagged when it scans cars or bookings without an index.
+
+Totals are kept per worker process; GET /api/admin/slow-queries lists the
+worker's top fingerprints by total time, while the log has every worker's
+slow statements.
+
+Each worker process writes its own log file, SLOW_QUERY_LOG with the pid
+before the extension (car-rental-slow-queries.<pid>.log), since log
+rotation is not safe across processes sharing one file.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from logging.handlers import RotatingFileHandler
+
+import database
+
+# Unset disables the recorder; 0 logs every statement
+SLOW_QUERY_MS = os.environ.get('SLOW_QUERY_MS')
+SLOW_QUERY_LOG = os.environ.get(
+    'SLOW_QUERY_LOG', os.path.join(tempfile.gettempdir(), 'car-rental-slow-queries.log')
+)
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5))
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.environ.get('SLOW_QUERY_MAX_FINGERPRINTS', 1000))
+
+# Statements that have a query plan
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+# Query plan lines that read cars/bookings without an index or sort
+BAD_PLAN = re.compile(r'SCAN (bookings|cars)\b(?! USING)|USE TEMP B-TREE')
+# Ordering FTS matches by BM25 rank always takes a sort
+FTS_PLAN = re.compile(r'VIRTUAL TABLE INDEX')
+RANK_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+# database.get_car_facets() groups by every facet column plus the price
+# bucket, which no index can serve; the few groups make the sort cheap
+FACET_GROUP = re.compile(r'GROUP BY .*\bprice_bucket, in_range\b', re.S)
+GROUP_SORT = 'USE TEMP B-TREE FOR GROUP BY'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_COMMENT = re.compile(r'--[^\n]*')
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+_SPACE = re.compile(r'\s+')
+
+def fingerprint(sql):
+    """Normalise a statement: literals become ?, ? lists collapse, comments go."""
+    sql = _STRING.sub('?', sql)
+    sql = _COMMENT.sub('', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('?, ...', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+def explain(sql):
+    """EXPLAIN QUERY PLAN for sql, binding NULL to every placeholder.
+
+    Runs on its own read-only connection, so it is neither timed nor part of
+    the caller's transaction.
+    """
+    placeholders = _STRING.sub('', sql).count('?')
+    conn = sqlite3.connect(f'file:{database.DATABASE_PATH}?mode=ro', uri=True)
+    try:
+        rows = conn.execute('EXPLAIN QUERY PLAN ' + sql, [None] * placeholders).fetchall()
+    finally:
+        conn.close()
+    # (id, parent, notused, detail); indent children under their parent
+    depth = {0: -1}
+    plan = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        plan.append('  ' * depth[node] + detail)
+    return plan
+
+def bad_plan_lines(plan, sql=''):
+    """The lines of sql's EXPLAIN QUERY PLAN that no index serves."""
+    bad = [line for line in plan if BAD_PLAN.search(line)]
+    if any(FTS_PLAN.search(line) for line in plan):
+        bad = [line for line in bad if RANK_SORT not in line]
+    if FACET_GROUP.search(sql):
+        bad = [line for line in bad if GROUP_SORT not in line]
+    return bad
+
+class SlowQueryRecorder:
+    """Per-fingerprint statement totals, fed by database.QUERY_LISTENERS."""
+
+    def __init__(self, threshold_ms, max_fingerprints=SLOW_QUERY_MAX_FINGERPRINTS, logger=None):
+        self.threshold = threshold_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.fingerprints = {}
+
+    def on_query(self, sql, seconds, executions):
+        """database.QUERY_LISTENERS callback."""
+        if sql is None:
+            return
+        local = self._local
+        pending = getattr(local, 'pending', None)
+        if executions:
+            # A new statement on this thread: the previous one is done
+            if pending is not None:
+                self._finish(*pending)
+            local.pending = [sql, seconds]
+        elif pending is not None and pending[0] == sql:
+            pending[1] += seconds
+        else:
+            # Rows fetched from an older cursor; count them towards its totals only
+            self._add(sql, seconds, 0)
+
+    def finish(self):
+        """Complete this thread's last statement, e.g. at the end of a request."""
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            self._local.pending = None
+            self._finish(*pending)
+
+    def _add(self, sql, seconds, calls):
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self.fingerprints.get(key)
+            if stats is None:
+                if len(self.fingerprints) >= self.max_fingerprints:
+                    # Make room by dropping the cheapest fingerprint
+                    cheapest = min(self.fingerprints, key=lambda k: self.fingerprints[k]['total'])
+                    del self.fingerprints[cheapest]
+                stats = self.fingerprints[key] = {
+                    'id': hashlib.sha1(key.encode()).hexdigest()[:12],
+                    'calls': 0, 'slow_calls': 0, 'total': 0.0, 'max': 0.0,
+                    'plan': None, 'full_scan': None,
+                }
+            stats['calls'] += calls
+            stats['total'] += seconds
+            if calls:
+                stats['max'] = max(stats['max'], seconds)
+            return key, stats
+
+    def _finish(self, sql, seconds):
+        key, stats = self._add(sql, seconds, 1)
+        if seconds < self.threshold:
+            return
+        capture = False
+        with self._lock:
+            stats['slow_calls'] += 1
+            if stats['plan'] is None and sql.lstrip().upper().startswith(EXPLAINABLE):
+                stats['plan'] = []  # claimed; other threads won't capture it again
+                capture = True
+        entry = {'fingerprint': stats['id'], 'ms': round(seconds * 1000, 2), 'sql': key}
+        if capture:
+            try:
+                plan = explain(sql)
+            except sqlite3.Error as e:
+                plan = [f'EXPLAIN failed: {e}']
+            with self._lock:
+                stats['plan'] = plan
+                stats['full_scan'] = bool(bad_plan_lines(plan, sql))
+            entry.update(plan=plan, full_scan=stats['full_scan'])
+        if self.logger:
+            self.logger.warning(json.dumps(entry))
+
+    def top(self, limit=20):
+        """The limit fingerprints with the most total time, slowest first."""
+        with self._lock:
+            ranked = sorted(self.fingerprints.items(), key=lambda item: item[1]['total'], reverse=True)
+            return [{
+                'fingerprint': stats['id'],
+                'sql': key,
+                'calls': stats['calls'],
+                'slow_calls': stats['slow_calls'],
+                'total_ms': round(stats['total'] * 1000, 2),
+                'mean_ms': round(stats['total'] * 1000 / stats['calls'], 3) if stats['calls'] else None,
+                'max_ms': round(stats['max'] * 1000, 2),
+                'plan': stats['plan'] or None,
+                'full_scan': stats['full_scan'],
+            } for key, stats in ranked[:limit]]
+
+recorder = None
+
+def worker_log_path(path, pid=None):
+    """path with a pid before its extension, e.g. slow.log -> slow.1234.log."""
+    root, ext = os.path.splitext(path)
+    return f'{root}.{os.getpid() if pid is None else pid}{ext}'
+
+class WorkerLogHandler(RotatingFileHandler):
+    """RotatingFileHandler writing to a file of its own in every process."""
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self.pid = os.getpid()
+        super().__init__(worker_log_path(path, self.pid), delay=True, **kwargs)
+
+    def emit(self, record):
+        if os.getpid() != self.pid:
+            # Forked after the handler was made; the parent's file isn't ours
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.pid = os.getpid()
+            self.baseFilename = os.path.abspath(worker_log_path(self.path, self.pid))
+        super().emit(record)
+
+def make_logger(path=SLOW_QUERY_LOG):
+    logger = logging.getLogger('car_rental.slow_queries')
+    logger.propagate = False
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = WorkerLogHandler(path, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                   backupCount=SLOW_QUERY_LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(asctime)s pid=%(process)d %(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+def enable(threshold_ms, log_path=SLOW_QUERY_LOG):
+    """Start recording statements on every pooled connection; returns the recorder."""
+    global recorder
+    if recorder is None:
+        recorder = SlowQueryRecorder(threshold_ms, logger=make_logger(log_path) if log_path else None)
+        database.QUERY_LISTENERS.append(recorder.on_query)
+    return recorder
+
+def init_slow_query_log(app):
+    """Enable the recorder when SLOW_QUERY_MS is set."""
+    if SLOW_QUERY_MS is None or SLOW_QUERY_MS == '':
+        return
+    enable(float(SLOW_QUERY_MS))
+
+    @app.teardown_request
+    def finish_statement(exc):
+        recorder.finish()
@@ -0,0 +1,190 @@
+"""
+Fingerprinted, precompressed frontend assets.
+
+build() copies frontend/ into STATIC_BUILD_DIR. CSS and JS files get a
+content hash in their name and HTML references are rewritten to match. Text
+assets get .gz siblings, and .br ones when the brotli package is installed.
+manifest.json maps every public URL path to its file, ETag, mimetype,
+available encodings and whether it may be cached forever: fingerprinted
+CSS/JS and the car image variants, which image_variants.py already names
+by content hash. Other images are cached for a day; everything else is
+revalidated with its ETag.
+
+app.py loads the manifest once at startup and serves every asset from it
+with send_asset(), so requests never probe the filesystem to find a file.
+A manifest older than any file under frontend/ is ignored (with a warning)
+and frontend/ is served directly, as is the case under the "python app.py"
+development server, so edits never go out stale.
+
+Usage: python static_assets.py   (run by build.sh)
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+STATIC_BUILD_DIR = os.environ.get(
+    'STATIC_BUILD_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'build', 'static')
+)
+MANIFEST_NAME = 'manifest.json'
+
+# Files renamed to <name>.<hash>.<ext> and served as immutable
+FINGERPRINT_EXTENSIONS = ('.css', '.js')
+# Files worth precompressing
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.txt')
+# Preferred first when the client accepts several
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Image variants written by image_variants.py, named <name>.<hash>.<ext>
+HASHED_IMAGE = re.compile(r'^images/cars/variants/[^/]+\.[0-9a-f]{12}\.(?:webp|jpg|png)$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+# Other images rarely change in place; a day saves revalidating every card
+IMAGE_CACHE_CONTROL = 'public, max-age=86400'
+
+ASSET_REFERENCE = re.compile(r'''((?:href|src)=["'])/([^"']+\.(?:css|js))(["'])''')
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def write_encodings(path, data):
+    """Write compressed siblings of path; returns the encodings written."""
+    encodings = []
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + ENCODING_SUFFIXES['br'], 'wb') as f:
+                f.write(compressed)
+            encodings.append('br')
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(path + ENCODING_SUFFIXES['gzip'], 'wb') as f:
+            f.write(compressed)
+        encodings.append('gzip')
+    return encodings
+
+def build(source_dir=FRONTEND_DIR, out_dir=STATIC_BUILD_DIR):
+    """Build the fingerprinted asset tree and its manifest. Returns the manifest."""
+    source_dir = os.path.abspath(source_dir)
+    out_dir = os.path.abspath(out_dir)
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+
+    sources = []
+    for root, _, files in os.walk(source_dir):
+        for filename in files:
+            full_path = os.path.join(root, filename)
+            sources.append(os.path.relpath(full_path, source_dir).replace(os.sep, '/'))
+    sources.sort()
+
+    # Fingerprint CSS/JS first so HTML can point at the hashed names
+    renamed = {}
+    for rel_path in sources:
+        if rel_path.endswith(FINGERPRINT_EXTENSIONS):
+            with open(os.path.join(source_dir, rel_path), 'rb') as f:
+                digest = content_hash(f.read())
+            stem, ext = os.path.splitext(rel_path)
+            renamed[rel_path] = f'{stem}.{digest}{ext}'
+
+    manifest = {}
+    for rel_path in sources:
+        with open(os.path.join(source_dir, rel_path), 'rb') as f:
+            data = f.read()
+        if rel_path.endswith('.html'):
+            data = ASSET_REFERENCE.sub(
+                lambda m: m.group(1) + '/' + renamed.get(m.group(2), m.group(2)) + m.group(3),
+                data.decode('utf-8')
+            ).encode('utf-8')
+
+        target = renamed.get(rel_path, rel_path)
+        target_path = os.path.join(out_dir, target)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        with open(target_path, 'wb') as f:
+            f.write(data)
+
+        encodings = write_encodings(target_path, data) if rel_path.endswith(COMPRESSIBLE_EXTENSIONS) else []
+        entry = {
+            'file': target,
+            'etag': content_hash(data),
+            'mimetype': mimetypes.guess_type(rel_path)[0] or 'application/octet-stream',
+            'encodings': encodings,
+        }
+        manifest[target] = dict(entry, immutable=target != rel_path or bool(HASHED_IMAGE.match(rel_path)))
+        if target != rel_path:
+            # Old unhashed URL keeps working, but must be revalidated
+            manifest[rel_path] = dict(entry, immutable=False)
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+def newest_source_mtime(source_dir=FRONTEND_DIR):
+    """Modification time of the most recently changed file under source_dir."""
+    newest = 0.0
+    for root, _, files in os.walk(source_dir):
+        for filename in files:
+            newest = max(newest, os.path.getmtime(os.path.join(root, filename)))
+    return newest
+
+def load_manifest(build_dir=STATIC_BUILD_DIR, source_dir=FRONTEND_DIR):
+    """Load a built manifest, or return None if assets haven't been built or are stale."""
+    path = os.path.join(build_dir, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if os.path.getmtime(path) < newest_source_mtime(source_dir):
+        print(f"Ignoring {os.path.abspath(path)}: frontend/ changed since it was built; "
+              f"rerun static_assets.py to serve built assets")
+        return None
+    return manifest
+
+def send_asset(manifest, path, build_dir=STATIC_BUILD_DIR, fallback='index.html'):
+    """Serve path from the manifest, falling back to index.html for unknown paths."""
+    entry = manifest.get(path) or manifest[fallback]
+    encoding = next(
+        (name for name in ENCODING_SUFFIXES
+         if name in entry['encodings'] and request.accept_encodings[name]),
+        None
+    )
+    filename = entry['file'] + (ENCODING_SUFFIXES[encoding] if encoding else '')
+    response = send_file(
+        os.path.join(build_dir, filename),
+        mimetype=entry['mimetype'],
+        etag=entry['etag'] + (f'-{encoding}' if encoding else ''),
+        conditional=True
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if entry['encodings']:
+        response.vary.add('Accept-Encoding')
+    if entry['immutable']:
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    elif entry['mimetype'].startswith('image/'):
+        response.headers['Cache-Control'] = IMAGE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+if __name__ == '__main__':
+    result = build()
+    fingerprinted = sum(1 for entry in result.values() if entry['immutable'])
+    compressed = sum(1 for entry in result.values() if entry['encodings'])
+    print(f"Built {len(result)} asset paths into {os.path.abspath(STATIC_BUILD_DIR)}")
+    print(f"  {fingerprinted} fingerprinted, {compressed} precompressed"
+          f"{'' if brotli else ' (gzip only; install brotli for .br)'}")
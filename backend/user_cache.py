@@ -0,0 +1,30 @@
+"""
+Per-worker cache of user profiles, keyed by user id.
+
+Holds only the columns the API returns (database.USER_PROFILE_COLUMNS), so
+/api/user and the auth decorators answer without a database round trip on
+the warm path. Entries expire after USER_CACHE_TTL seconds, and the whole
+cache is cleared when the users change counter moves (checked every
+USER_CACHE_CHECK_INTERVAL seconds). Every write to users bumps it, so a
+profile changed in any process, or a new registration or password rehash,
+costs each worker one query per active user on their next request.
+"""
+
+import os
+
+import database
+from cache import VersionedCache
+
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 300))
+USER_CACHE_CHECK_INTERVAL = float(os.environ.get('USER_CACHE_CHECK_INTERVAL', 5))
+
+profile_cache = VersionedCache(('users',), USER_CACHE_SIZE, USER_CACHE_TTL, USER_CACHE_CHECK_INTERVAL)
+
+def get_user_profile(user_id):
+    """Cached database.get_user_profile()."""
+    return profile_cache.get_or_load(user_id, lambda: database.get_user_profile(user_id))
+
+def prime_user_profile(user):
+    """Cache the profile part of a full user row, e.g. right after login."""
+    profile_cache.put(user['id'], {column: user[column] for column in database.USER_PROFILE_COLUMNS})
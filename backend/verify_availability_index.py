@@ -0,0 +1,74 @@
+"""
+Consistency check for the in-memory availability index.
+
+Builds a scratch database, then mixes random bookings and cancellations made
+through database.py (write-through) and through a separate raw connection
+(simulating another worker), comparing every index answer with the SQL path.
+
+Usage: python verify_availability_index.py [rounds]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import database
+from availability_index import AvailabilityIndex
+
+def random_window(rng):
+    pickup = date(2030, 1, 1) + timedelta(days=rng.randint(0, 120))
+    return str(pickup), str(pickup + timedelta(days=rng.randint(1, 10)))
+
+def main(rounds=2000):
+    tmpdir = tempfile.mkdtemp()
+    database.DATABASE_PATH = os.path.join(tmpdir, 'index.db')
+    database.init_db()
+
+    index = AvailabilityIndex(check_interval=0)
+    database.BOOKING_LISTENERS.append(index.on_booking_change)
+    other_worker = sqlite3.connect(database.DATABASE_PATH)
+
+    rng = random.Random(42)
+    car_ids = list(range(1, 13))
+    mismatches = 0
+    rejected = 0
+    for _ in range(rounds):
+        action = rng.random()
+        car_id = rng.choice(car_ids)
+        pickup_date, return_date = random_window(rng)
+        if action < 0.25:
+            try:
+                database.create_booking(1, car_id, pickup_date, return_date, 1, 1, 100.0)
+            except database.BookingConflictError:
+                # Overlaps are refused; the index must not record them either
+                rejected += 1
+        elif action < 0.35:
+            other_worker.execute('''
+                INSERT INTO bookings (user_id, car_id, pickup_date, return_date,
+                                      pickup_location_id, return_location_id, total_price)
+                VALUES (1, ?, ?, ?, 1, 1, 100.0)
+            ''', (car_id, pickup_date, return_date))
+            other_worker.commit()
+        elif action < 0.45:
+            row = other_worker.execute(
+                "SELECT id FROM bookings WHERE status = 'confirmed' ORDER BY RANDOM() LIMIT 1"
+            ).fetchone()
+            if row:
+                database.cancel_booking(row[0], 1)
+        else:
+            expected = database.check_car_availability(car_id, pickup_date, return_date)
+            actual = index.is_available(car_id, pickup_date, return_date)
+            if expected != actual:
+                mismatches += 1
+                print(f"MISMATCH car {car_id} {pickup_date}..{return_date}: sql={expected} index={actual}")
+
+    other_worker.close()
+    print(f"{rounds} rounds, {index.loads} car loads, {rejected} rejected bookings, "
+          f"{mismatches} mismatches")
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:2])))
@@ -0,0 +1,59 @@
+"""
+Multi-process stress check for booking creation.
+
+Several processes race to book the same few cars for random, heavily
+overlapping date ranges through create_booking(). Afterwards no two
+confirmed bookings of the same car may overlap.
+
+Usage: python verify_booking_concurrency.py [processes] [attempts_per_process]
+"""
+
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from multiprocessing import Pool
+
+import database
+
+def book_randomly(args):
+    path, seed, attempts = args
+    database.DATABASE_PATH = path
+    rng = random.Random(seed)
+    created = conflicts = 0
+    for _ in range(attempts):
+        pickup = date(2030, 1, 1) + timedelta(days=rng.randint(0, 30))
+        return_date = pickup + timedelta(days=rng.randint(1, 5))
+        try:
+            database.create_booking(1, rng.randint(1, 3), str(pickup), str(return_date), 1, 1, 100.0)
+            created += 1
+        except database.BookingConflictError:
+            conflicts += 1
+    return created, conflicts
+
+def main(processes=8, attempts=200):
+    path = os.path.join(tempfile.mkdtemp(), 'stress.db')
+    database.DATABASE_PATH = path
+    database.init_db()
+    database.get_pool().close_all()
+
+    with Pool(processes) as pool:
+        results = pool.map(book_randomly, [(path, seed, attempts) for seed in range(processes)])
+
+    conn = database.get_db_connection()
+    overlaps = conn.execute('''
+        SELECT COUNT(*) FROM bookings a
+        JOIN bookings b ON a.car_id = b.car_id AND a.id < b.id
+        WHERE a.status = 'confirmed' AND b.status = 'confirmed'
+        AND a.pickup_date <= b.return_date AND a.return_date >= b.pickup_date
+    ''').fetchone()[0]
+    conn.close()
+
+    created = sum(r[0] for r in results)
+    conflicts = sum(r[1] for r in results)
+    print(f"{processes} processes: {created} bookings created, {conflicts} conflicts, {overlaps} overlapping pairs")
+    return 1 if overlaps else 0
+
+if __name__ == '__main__':
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:3])))
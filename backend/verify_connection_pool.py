@@ -0,0 +1,104 @@
+"""
+Multi-thread stress check for the connection pool.
+
+Several threads repeatedly check a connection out of get_db_connection(),
+run a statement or a small write transaction on it and close() it, and
+some of them fail half-way through (a bad statement, or an exception
+raised mid-transaction) the way a view can. Checks that:
+
+- no connection is ever held by two threads at once
+- the pool never keeps more than its size of idle connections, and never
+  hands out a connection it has already closed
+- every connection ends up back in the pool or closed, with no
+  transaction left open, exceptions or not
+
+Usage: python verify_connection_pool.py [threads] [rounds_per_thread]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+
+import database
+
+class Abort(Exception):
+    """Raised inside a transaction to simulate a failing view."""
+
+def main(threads=16, rounds=500):
+    path = os.path.join(tempfile.mkdtemp(), 'pool.db')
+    database.DATABASE_PATH = path
+    database.init_db()
+    pool = database.get_pool()
+    pool.close_all()
+
+    lock = threading.Lock()
+    in_use = {}   # id(conn) -> thread holding it
+    seen = {}     # id(conn) -> conn, keeping every connection alive for the final check
+    problems = []
+    failures = 0
+
+    def work(seed):
+        nonlocal failures
+        rng = random.Random(seed)
+        me = threading.get_ident()
+        for _ in range(rounds):
+            conn = database.get_db_connection()
+            with lock:
+                if conn.pool is None:
+                    problems.append('handed out a closed connection')
+                if id(conn) in in_use:
+                    problems.append('connection shared between threads')
+                in_use[id(conn)] = me
+                seen[id(conn)] = conn
+                if pool.stats()['idle'] > pool.size:
+                    problems.append(f"{pool.stats()['idle']} idle connections, pool size {pool.size}")
+            try:
+                action = rng.random()
+                if action < 0.2:
+                    conn.execute('SELECT * FROM no_such_table')
+                elif action < 0.4:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute("UPDATE table_versions SET version = version WHERE name = 'cars'")
+                    raise Abort()
+                elif action < 0.6:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute("UPDATE table_versions SET version = version WHERE name = 'cars'")
+                    conn.commit()
+                else:
+                    conn.execute('SELECT COUNT(*) FROM cars').fetchone()
+            except (sqlite3.Error, Abort):
+                with lock:
+                    failures += 1
+            finally:
+                with lock:
+                    if in_use.pop(id(conn), None) != me:
+                        problems.append('connection released by another thread')
+                conn.close()
+
+    workers = [threading.Thread(target=work, args=(seed,)) for seed in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    idle = {id(conn) for conn in pool._idle}
+    if len(idle) != len(pool._idle):
+        problems.append('connection idle in the pool twice')
+    if len(idle) > pool.size:
+        problems.append(f'{len(idle)} idle connections, pool size {pool.size}')
+    leaked = [conn for key, conn in seen.items() if key not in idle and conn.pool is not None]
+    open_transactions = sum(1 for conn in pool._idle if conn.in_transaction)
+    pool.close_all()
+
+    print(f"{threads} threads x {rounds} rounds: {len(seen)} connections used, "
+          f"{pool.created} created, {failures} failed rounds, {len(leaked)} leaked, "
+          f"{open_transactions} idle in a transaction, {len(problems)} problems")
+    for problem in sorted(set(problems)):
+        print(f"  {problem}")
+    return 1 if problems or leaked or open_transactions else 0
+
+if __name__ == '__main__':
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:3])))
@@ -23,18 +23,38 @@ REM Step 2: Initialize database
 echo Initializing database...
 cd backend
 
-python -c "from database import init_db; import os; db_path = os.path.join(os.path.dirname(__file__), 'car_rental.db'); init_db() if not os.path.exists(db_path) else print('Database already exists')"
+python -c "from database import init_db, migrate_db, DATABASE_PATH; import os; init_db() if not os.path.exists(DATABASE_PATH) else migrate_db()"
 
 if %ERRORLEVEL% NEQ 0 (
     echo Failed to initialize database
     exit /b 1
 )
 
-cd ..
 echo Database ready
 echo.
 
-REM Step 3: Verify installation
+REM Step 3: Build frontend assets
+echo Building responsive car image variants...
+python image_variants.py
+
+if %ERRORLEVEL% NEQ 0 (
+    echo Failed to build image variants
+    exit /b 1
+)
+
+echo Building fingerprinted, precompressed frontend assets...
+python static_assets.py
+
+if %ERRORLEVEL% NEQ 0 (
+    echo Failed to build frontend assets
+    exit /b 1
+)
+
+cd ..
+echo Frontend assets built
+echo.
+
+REM Step 4: Verify installation
 echo Verifying installation...
 
 python -c "import flask" 2>nul
@@ -52,7 +72,7 @@ if %ERRORLEVEL% NEQ 0 (
 echo All components verified
 echo.
 
-REM Step 4: Build complete
+REM Step 5: Build complete
 echo =========================================
 echo Build completed successfully!
 echo =========================================
@@ -25,16 +25,16 @@ echo "🗄️  Initializing database..."
 cd backend
 
 python3 << EOF
-from database import init_db
+from database import init_db, migrate_db, DATABASE_PATH
 import os
 
-db_path = os.path.join(os.path.dirname(__file__), 'car_rental.db')
-if not os.path.exists(db_path):
+if not os.path.exists(DATABASE_PATH):
     print("Creating database...")
     init_db()
     print("Database initialized with sample data!")
 else:
-    print("Database already exists, skipping initialization")
+    print("Database already exists, applying migrations")
+    migrate_db()
 EOF
 
 if [ $? -ne 0 ]; then
@@ -42,11 +42,31 @@ if [ $? -ne 0 ]; then
     exit 1
 fi
 
-cd ..
 echo "✅ Database ready"
 echo ""
 
-# Step 3: Verify installation
+# Step 3: Build frontend assets
+echo "🖼️  Building responsive car image variants..."
+python3 image_variants.py
+
+if [ $? -ne 0 ]; then
+    echo "❌ Failed to build image variants"
+    exit 1
+fi
+
+echo "🎨 Building fingerprinted, precompressed frontend assets..."
+python3 static_assets.py
+
+if [ $? -ne 0 ]; then
+    echo "❌ Failed to build frontend assets"
+    exit 1
+fi
+
+cd ..
+echo "✅ Frontend assets built"
+echo ""
+
+# Step 4: Verify installation
 echo "🔍 Verifying installation..."
 
 # Check if Flask is installed
@@ -66,7 +86,7 @@ fi
 echo "✅ All components verified"
 echo ""
 
-# Step 4: Build complete
+# Step 5: Build complete
 echo "========================================="
 echo "✅ Build completed successfully!"
 echo "========================================="
@@ -1,7 +1,26 @@
 // Browse Cars JavaScript
 
-let allCars = [];
-let filteredCars = [];
+// Cars shown so far and the cursor for the next page of the current search
+let shownCars = [];
+let nextCursor = null;
+
+// Rendered width of a card image, used to pick from the srcset variants
+const CARD_IMAGE_SIZES = '(max-width: 768px) 100vw, 350px';
+
+// Filter inputs -> /api/cars/search query parameters
+const FILTER_PARAMS = {
+    filterQuery: 'q',
+    filterLocation: 'location_id',
+    filterCity: 'city',
+    filterType: 'car_type',
+    filterFuel: 'fuel_type',
+    filterTransmission: 'transmission',
+    filterSeats: 'seats',
+    filterMinPrice: 'min_price',
+    filterMaxPrice: 'max_price',
+    filterPickupDate: 'pickup_date',
+    filterReturnDate: 'return_date',
+};
 
 document.addEventListener('DOMContentLoaded', async () => {
     // Set minimum dates
@@ -12,12 +31,12 @@ document.addEventListener('DOMContentLoaded', async () => {
     // Load locations
     await loadLocations();
 
-    // Load cars
-    await loadCars();
-
     // Check URL parameters
     applyURLParams();
 
+    // Load the first page of cars and the filter counts
+    await loadCars();
+
     // Setup event listeners
     setupEventListeners();
 });
@@ -38,18 +57,88 @@ async function loadLocations() {
     }
 }
 
-async function loadCars() {
+function searchParams() {
+    const params = new URLSearchParams();
+    const pickupDate = document.getElementById('filterPickupDate').value;
+    const returnDate = document.getElementById('filterReturnDate').value;
+
+    Object.entries(FILTER_PARAMS).forEach(([id, param]) => {
+        const value = document.getElementById(id).value;
+        // Dates only filter as a pair
+        if (param.endsWith('_date') && !(pickupDate && returnDate)) return;
+        if (value !== '') params.set(param, value);
+    });
+    return params;
+}
+
+async function loadCars(more = false) {
+    const params = searchParams();
+    if (more) params.set('cursor', nextCursor);
+
     try {
-        allCars = await CarRental.apiRequest('/cars');
-        filteredCars = [...allCars];
-        displayCars(filteredCars);
+        const result = await CarRental.apiRequest(`/cars/search?${params}`);
+        shownCars = more ? shownCars.concat(result.items) : result.items;
+        nextCursor = result.next_cursor;
+        displayCars(shownCars, result.total);
+        if (!more) displayFacets(result.facets);
     } catch (error) {
         console.error('Failed to load cars:', error);
         document.getElementById('resultsInfo').textContent = 'Failed to load cars';
     }
 }
 
-function displayCars(cars) {
+function displayFacets(facets) {
+    document.querySelectorAll('.filter-sidebar select[data-facet]').forEach(select => {
+        const selected = select.value;
+        const counts = facets[select.dataset.facet] || [];
+
+        // Keep the "All ..." option, replace the rest with the current counts
+        select.length = 1;
+        counts.forEach(({ value, count }) => {
+            const option = document.createElement('option');
+            option.value = value;
+            option.textContent = `${value} (${count})`;
+            select.appendChild(option);
+        });
+        if (selected && !counts.some(({ value }) => String(value) === selected)) {
+            const option = document.createElement('option');
+            option.value = selected;
+            option.textContent = `${selected} (0)`;
+            select.appendChild(option);
+        }
+        select.value = selected;
+    });
+
+    displayPriceHistogram(facets.price);
+}
+
+function displayPriceHistogram(buckets) {
+    const histogram = document.getElementById('priceHistogram');
+    const minPrice = parseFloat(document.getElementById('filterMinPrice').value);
+    const maxPrice = parseFloat(document.getElementById('filterMaxPrice').value);
+    const largest = Math.max(1, ...buckets.map(bucket => bucket.count));
+
+    histogram.innerHTML = '';
+    buckets.forEach(bucket => {
+        const bar = document.createElement('div');
+        bar.className = 'price-histogram-bar';
+        if ((isNaN(minPrice) || bucket.max > minPrice) && (isNaN(maxPrice) || bucket.min <= maxPrice)) {
+            bar.classList.add('active');
+        }
+        bar.style.height = `${(bucket.count / largest) * 100}%`;
+        bar.title = `$${bucket.min}-$${bucket.max}: ${bucket.count} car${bucket.count !== 1 ? 's' : ''}`;
+
+        // Clicking a bar searches that price bucket
+        bar.addEventListener('click', () => {
+            document.getElementById('filterMinPrice').value = bucket.min;
+            document.getElementById('filterMaxPrice').value = bucket.max;
+            applyFilters();
+        });
+        histogram.appendChild(bar);
+    });
+}
+
+function displayCars(cars, total) {
     const grid = document.getElementById('carsGrid');
     const noResults = document.getElementById('noCarsMessage');
     const resultsInfo = document.getElementById('resultsInfo');
@@ -58,12 +147,14 @@ function displayCars(cars) {
 
     if (cars.length === 0) {
         noResults.classList.remove('hidden');
+        document.getElementById('loadMore').classList.add('hidden');
         resultsInfo.textContent = 'No cars found';
         return;
     }
 
     noResults.classList.add('hidden');
-    resultsInfo.textContent = `Showing ${cars.length} car${cars.length !== 1 ? 's' : ''}`;
+    resultsInfo.textContent = `Showing ${cars.length} of ${total} car${total !== 1 ? 's' : ''}`;
+    document.getElementById('loadMore').classList.toggle('hidden', !nextCursor);
 
     cars.forEach(car => {
         const card = document.createElement('div');
@@ -71,8 +162,12 @@ function displayCars(cars) {
         card.style.cursor = 'pointer';
         card.innerHTML = `
             <div class="card-image-container">
-                <img src="${car.image_url}" alt="${car.name}" class="card-image" 
-                     onerror="this.src='https://images.unsplash.com/photo-1494976388531-d1058494cdd8?w=800'">
+                <picture>
+                    ${car.image_webp_srcset ? `<source type="image/webp" srcset="${car.image_webp_srcset}" sizes="${CARD_IMAGE_SIZES}">` : ''}
+                    <img src="${car.image_url}" alt="${car.name}" class="card-image" loading="lazy"
+                         ${car.image_srcset ? `srcset="${car.image_srcset}" sizes="${CARD_IMAGE_SIZES}"` : ''}
+                         onerror="this.src='https://images.unsplash.com/photo-1494976388531-d1058494cdd8?w=800'">
+                </picture>
                 <div class="card-badge">${car.car_type}</div>
             </div>
             <div class="card-content">
@@ -109,32 +204,16 @@ function displayCars(cars) {
     });
 }
 
-function applyFilters() {
-    const locationId = document.getElementById('filterLocation').value;
-    const carType = document.getElementById('filterType').value;
-    const minPrice = parseFloat(document.getElementById('filterMinPrice').value) || 0;
-    const maxPrice = parseFloat(document.getElementById('filterMaxPrice').value) || Infinity;
-
-    filteredCars = allCars.filter(car => {
-        if (locationId && car.location_id != locationId) return false;
-        if (carType && car.car_type !== carType) return false;
-        if (car.price_per_day < minPrice || car.price_per_day > maxPrice) return false;
-        return true;
-    });
-
-    displayCars(filteredCars);
+async function applyFilters() {
+    await loadCars();
 }
 
 function clearFilters() {
-    document.getElementById('filterLocation').value = '';
-    document.getElementById('filterType').value = '';
-    document.getElementById('filterMinPrice').value = '';
-    document.getElementById('filterMaxPrice').value = '';
-    document.getElementById('filterPickupDate').value = '';
-    document.getElementById('filterReturnDate').value = '';
+    Object.keys(FILTER_PARAMS).forEach(id => {
+        document.getElementById(id).value = '';
+    });
 
-    filteredCars = [...allCars];
-    displayCars(filteredCars);
+    loadCars();
 
     // Clear URL parameters
     window.history.replaceState({}, '', '/browse.html');
@@ -152,15 +231,17 @@ function applyURLParams() {
     if (params.has('return')) {
         document.getElementById('filterReturnDate').value = params.get('return');
     }
-
-    if (params.has('location') || params.has('pickup') || params.has('return')) {
-        applyFilters();
-    }
 }
 
 function setupEventListeners() {
     document.getElementById('applyFilters').addEventListener('click', applyFilters);
     document.getElementById('clearFilters').addEventListener('click', clearFilters);
+    document.getElementById('loadMore').addEventListener('click', () => loadCars(true));
+
+    // Facet selects search as soon as they change
+    document.querySelectorAll('.filter-sidebar select').forEach(select => {
+        select.addEventListener('change', applyFilters);
+    });
 
     // Apply filters on Enter key
     document.querySelectorAll('.filter-sidebar input, .filter-sidebar select').forEach(element => {